@@ -0,0 +1,2 @@
+"""Benchmarks of the project, each module can be run with `python -m benchmarks.<module>`.
+"""
@@ -0,0 +1,331 @@
+"""Measure the latency, queries and memory of every API endpoint and of the stock reconciliation.
+
+Each scenario runs against a throwaway test database seeded with catalogs and shopping carts of the given
+sizes. The results are written as JSON and, when a baseline file is given, compared with it: the command
+exits with status 1 if any metric regressed beyond the threshold. Run it with `python -m benchmarks.api`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "iati_shopping_cart.settings")
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment  # noqa: E402
+
+from products.cron import STOCK_RECONCILIATION_JOB, update_product_stock  # noqa: E402
+from products.importer import ProductImporter  # noqa: E402
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, JobWatermark  # noqa: E402
+from products.traces import percentile  # noqa: E402
+
+BASE_URL = "/api/v1/"
+
+CATALOG_SIZES = [1000, 10000, 100000]
+CART_SIZES = [10, 100, 500, 1000]
+
+# Metrics compared with the baseline, relative to it. The number of queries doesn't depend on the machine,
+# any increase is a regression.
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+MEMORY_METRICS = ["peak_memory_kib"]
+
+ORDER_FORM = {
+    "name": "John",
+    "last_name": "Doe",
+    "address": "221B Baker Street",
+    "email": "john.doe@example.com",
+    "mobile_number": "+44 20 7946 0000",
+}
+
+
+@dataclass
+class State:
+    """The data seeded for a scenario, shared by its runs.
+    """
+
+    client: Client
+    product_ids: list[int]
+    cart_size: int = 0
+
+
+@dataclass
+class Scenario:
+    """Something to measure. `setup` runs before every run of `run` and isn't measured.
+    """
+
+    name: str
+    run: Callable[[State, int], None]
+    setup: Callable[[State], None] | None = None
+    uses_cart: bool = False
+
+
+def check(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request['PATH_INFO']} returned {response.status_code}: {response.content}")
+
+
+def seed_catalog(size: int, batch_size: int = 1000) -> list[int]:
+    """Create `size` products alternating caps and t-shirts and return their ids.
+
+    The products are inserted with the bulk importer, which is much faster than `tests.create_catalog` for the
+    largest catalogs.
+    """
+
+    product_ids = []
+    numbers = iter(range(size))
+
+    while batch := list(islice(numbers, batch_size)):
+        products = []
+        for number in batch:
+            common = {
+                "main_color": "red",
+                "secondary_colors": "blue, green",
+                "brand": "Acme",
+                "inclusion_date": datetime.utcnow().date(),
+                "photo_url": "https://example.com/product.png",
+                "unit_price": Decimal("10.00"),
+                # Enough stock for every run to add it to the shopping cart.
+                "initial_stock": 1000000,
+                "current_stock": 1000000,
+            }
+            if number % 2:
+                product = Tshirt(
+                    product_type=Product.TSHIRT, size="L", composition={"cotton": 50, "polyester": 50},
+                    gender="Man", has_sleeves=True, **common
+                )
+            else:
+                product = Cap(product_type=Product.CAP, logo_color="black", **common)
+
+            product.type_rank = Product.TYPE_RANKS[product.product_type]
+            product.description = product.build_description()
+            products.append(product)
+
+        ProductImporter.insert(products)
+        product_ids += [product.id for product in products]
+
+    return product_ids
+
+
+def seed_cart(state: State) -> None:
+    """Replace the current shopping cart with one of `state.cart_size` lines.
+    """
+
+    ShoppingCart.objects.filter(purchased=False).delete()
+    shopping_cart = ShoppingCart.objects.create()
+    CartItem.objects.bulk_create([
+        CartItem(shopping_cart=shopping_cart, product_id=product_id, quantity=1)
+        for product_id in state.product_ids[:state.cart_size]
+    ])
+
+
+def reset_stock_watermark(state: State) -> None:
+    """Make the next stock reconciliation a full one, its slowest case.
+    """
+
+    JobWatermark.objects.filter(job=STOCK_RECONCILIATION_JOB).delete()
+
+
+def get_products(state: State, i: int) -> None:
+    check(state.client.get(f"{BASE_URL}products/"))
+
+
+def get_product(state: State, i: int) -> None:
+    product_id = state.product_ids[i % len(state.product_ids)]
+    check(state.client.get(f"{BASE_URL}products/{product_id}/"))
+
+
+def add_product(state: State, i: int) -> None:
+    # Alternates between incrementing a line of the cart and adding a new one, while there are products left.
+    position = i // 2 % state.cart_size if i % 2 == 0 else state.cart_size + i // 2
+    product_id = state.product_ids[position % len(state.product_ids)]
+    check(state.client.post(f"{BASE_URL}add_product/", {"product_id": product_id, "quantity": 1}))
+
+
+def view_cart(state: State, i: int) -> None:
+    check(state.client.get(f"{BASE_URL}view_cart/"))
+
+
+def order(state: State, i: int) -> None:
+    check(state.client.post(f"{BASE_URL}order/", ORDER_FORM))
+
+
+def reconcile_stock(state: State, i: int) -> None:
+    update_product_stock()
+
+
+SCENARIOS = [
+    Scenario("products/", get_products),
+    Scenario("products/<pk>/", get_product),
+    Scenario("update_product_stock", reconcile_stock, setup=reset_stock_watermark),
+    Scenario("add_product/", add_product, uses_cart=True),
+    Scenario("view_cart/", view_cart, uses_cart=True),
+    Scenario("order/", order, setup=seed_cart, uses_cart=True),
+]
+
+
+def measure(scenario: Scenario, state: State, iterations: int, warmup: int = 1) -> dict:
+    """Run a scenario and return its metrics.
+
+    The latency is measured over `iterations` runs, after `warmup` runs that aren't. The queries and the peak
+    memory are measured on one more run, since tracing the memory allocations slows the code down.
+    """
+
+    def prepare() -> None:
+        if scenario.setup:
+            scenario.setup(state)
+        # Every run starts with an empty cache, so the catalog cache doesn't hide the views.
+        cache.clear()
+
+    timings = []
+    for i in range(warmup + iterations):
+        prepare()
+        start = time.perf_counter()
+        scenario.run(state, i)
+        if i >= warmup:
+            timings.append((time.perf_counter() - start) * 1000)
+
+    prepare()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as context:
+            scenario.run(state, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": len(context.captured_queries),
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def run_scenarios(
+    state: State, catalog_size: int, cart_sizes: list[int], iterations: int, scenarios: list[Scenario] = SCENARIOS
+) -> dict[str, dict]:
+    """Measure the scenarios against the seeded catalog, those that use a cart once per cart size.
+    """
+
+    results = {}
+
+    for scenario in scenarios:
+        for cart_size in (cart_sizes if scenario.uses_cart else [0]):
+            name = f"{scenario.name} catalog={catalog_size}"
+            if scenario.uses_cart:
+                name += f" cart={cart_size}"
+
+            state.cart_size = cart_size
+            seed_cart(state)
+            results[name] = measure(scenario, state, iterations)
+            print(f"{name:<48}{results[name]['p50_ms']:>10.2f}{results[name]['p95_ms']:>10.2f}"
+                  f"{results[name]['queries']:>9}{results[name]['peak_memory_kib']:>12.1f}", file=sys.stderr)
+
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Return a description of every metric worse than in the baseline.
+
+    Latency and memory regress when they exceed the baseline by more than `threshold`, a fraction of it, and
+    the number of queries when it increases at all. Scenarios missing from the baseline aren't compared.
+    """
+
+    regressions = []
+
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+
+        for metric in LATENCY_METRICS + MEMORY_METRICS:
+            if metrics[metric] > baseline[name][metric] * (1 + threshold):
+                regressions.append(f"{name}: {metric} went from {baseline[name][metric]} to {metrics[metric]}")
+
+        if metrics["queries"] > baseline[name]["queries"]:
+            regressions.append(f"{name}: queries went from {baseline[name]['queries']} to {metrics['queries']}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--catalog-sizes", type=int, nargs="+", default=CATALOG_SIZES, help="Number of products of each catalog."
+    )
+    parser.add_argument(
+        "--cart-sizes", type=int, nargs="+", default=CART_SIZES, help="Number of lines of each shopping cart."
+    )
+    parser.add_argument("--iterations", type=int, default=20, help="Number of measured runs per scenario.")
+    parser.add_argument("--output", help="File the results are written to, standard output by default.")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare with.")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="Fraction by which the latency or memory can exceed the baseline before it's a regression."
+    )
+    options = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        results = {}
+        print(f"{'scenario':<48}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'memory KiB':>12}", file=sys.stderr)
+
+        for catalog_size in options.catalog_sizes:
+            call_command("flush", interactive=False, verbosity=0)
+            product_ids = seed_catalog(catalog_size)
+            # A cart can't have more lines than products in the catalog.
+            cart_sizes = [cart_size for cart_size in options.cart_sizes if cart_size <= catalog_size]
+            results |= run_scenarios(State(Client(), product_ids), catalog_size, cart_sizes, options.iterations)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    output = {
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], options.threshold)
+
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
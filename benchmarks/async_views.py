@@ -0,0 +1,84 @@
+"""Compare the throughput of the sync and async views under concurrent requests.
+
+The requests are made in process through the ASGI handler against a throwaway test database, so the numbers
+measure the views and not the network. Run it with `python -m benchmarks.async_views`.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "iati_shopping_cart.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from products.models import ShoppingCart, CartItem  # noqa: E402
+
+from tests import create_catalog  # noqa: E402
+
+BASE_URL = "/api/v1/"
+
+PATHS = ["products/", "products/{product_id}/", "view_cart/"]
+
+
+def seed(catalog_size: int) -> int:
+    products = create_catalog(catalog_size)
+    shopping_cart = ShoppingCart.objects.create()
+    CartItem.objects.bulk_create([
+        CartItem(shopping_cart=shopping_cart, product=product, quantity=1) for product in products[:20]
+    ])
+
+    return products[0].id
+
+
+async def run(url: str, requests: int, concurrency: int) -> float:
+    """Make `requests` GET requests to the url, `concurrency` at a time, and return the requests per second.
+    """
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(i: int):
+        async with semaphore:
+            # A different query string on every request, so the catalog cache doesn't hide the views.
+            response = await client.get(url, {"request": i})
+            assert response.status_code == 200, response.status_code
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Number of requests per view and mode.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of requests in flight at a time.")
+    parser.add_argument("--catalog-size", type=int, default=200, help="Number of products created.")
+    options = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        product_id = seed(options.catalog_size)
+
+        print(f"{'view':<24}{'sync req/s':>12}{'async req/s':>13}")
+        for path in PATHS:
+            path = path.format(product_id=product_id)
+            sync_throughput = asyncio.run(run(f"{BASE_URL}{path}", options.requests, options.concurrency))
+            async_throughput = asyncio.run(run(f"{BASE_URL}async/{path}", options.requests, options.concurrency))
+            print(f"{path:<24}{sync_throughput:>12.1f}{async_throughput:>13.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
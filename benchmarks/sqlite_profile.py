@@ -0,0 +1,107 @@
+"""Compare the throughput of the cart writes under concurrent threads with each database profile.
+
+Every profile runs in a subprocess of its own against a temporary database file, since the profile is read
+from the environment when the settings are loaded. Run it with `python -m benchmarks.sqlite_profile`.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROFILES = ["default", "performance"]
+
+ADD_PRODUCT_URL = "/api/v1/add_product/"
+VIEW_CART_URL = "/api/v1/view_cart/"
+
+
+def run_load(threads: int, requests_per_thread: int) -> dict:
+    """Seed a catalog and make the requests from `threads` threads, three cart writes for every cart read.
+    """
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, connections
+    from django.test import Client
+
+    from tests import create_catalog
+
+    call_command("migrate", verbosity=0)
+    product_ids = [product.id for product in create_catalog(threads * 10)]
+    connections.close_all()
+
+    def worker(thread: int) -> tuple[int, int]:
+        client = Client(HTTP_HOST="localhost")
+        succeeded = failed = 0
+
+        for i in range(requests_per_thread):
+            try:
+                if i % 4 == 3:
+                    response = client.get(VIEW_CART_URL)
+                else:
+                    product_id = product_ids[(thread * requests_per_thread + i) % len(product_ids)]
+                    response = client.post(ADD_PRODUCT_URL, {"product_id": product_id, "quantity": 1})
+            except OperationalError:
+                # "database is locked" after waiting for the busy timeout.
+                failed += 1
+            else:
+                succeeded += response.status_code < 400
+                failed += response.status_code >= 400
+
+        connections.close_all()
+        return succeeded, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(result[0] for result in results)
+    return {
+        "succeeded": succeeded,
+        "failed": sum(result[1] for result in results),
+        "throughput": succeeded / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="Number of threads making requests.")
+    parser.add_argument("--requests", type=int, default=200, help="Number of requests per thread.")
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.profile:
+        print(json.dumps(run_load(options.threads, options.requests)))
+        return
+
+    print(f"{'profile':<14}{'req/s':>10}{'succeeded':>12}{'failed':>9}")
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = os.environ | {
+                "DJANGO_SETTINGS_MODULE": "iati_shopping_cart.settings",
+                "DATABASE_PROFILE": profile,
+                "DATABASE_NAME": str(Path(directory) / "db.sqlite3"),
+            }
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.sqlite_profile", "--profile", profile,
+                    "--threads", str(options.threads), "--requests", str(options.requests)
+                ],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+
+        print(f"{profile:<14}{result['throughput']:>10.1f}{result['succeeded']:>12}{result['failed']:>9}")
+
+
+if __name__ == "__main__":
+    main()
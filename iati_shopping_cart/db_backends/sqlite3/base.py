@@ -0,0 +1,30 @@
+"""SQLite backend tuned for concurrent requests.
+
+It applies the `PRAGMAS` option to every new connection and starts with `BEGIN IMMEDIATE` the transactions
+opened by `products.transactions.write_atomic`, so they wait for the write lock up front instead of failing
+with "database is locked" when they try to upgrade a read lock.
+"""
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set by `write_atomic` for the next transaction started on the connection.
+    transaction_mode: str | None = None
+
+    def get_connection_params(self) -> dict:
+        params = super().get_connection_params()
+        params.pop("pragmas", None)
+
+        return params
+
+    def get_new_connection(self, conn_params: dict):
+        connection = super().get_new_connection(conn_params)
+
+        for pragma, value in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}" if self.transaction_mode else "BEGIN")
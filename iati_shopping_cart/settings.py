@@ -45,10 +45,14 @@ INSTALLED_APPS = [
 ]
 
 CRONJOBS = [
-    ('0 * * * *', 'products.cron.update_product_stock')
+    ('0 * * * *', 'products.cron.update_product_stock'),
+    ('30 3 * * *', 'products.cron.take_stock_snapshots'),
 ]
 
 MIDDLEWARE = [
+    'products.timing.ServerTimingMiddleware',
+    'products.traces.TraceRecorderMiddleware',
+    'products.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'products.replicas.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'iati_shopping_cart.urls'
@@ -85,10 +90,92 @@ WSGI_APPLICATION = 'iati_shopping_cart.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("DATABASE_NAME", BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Set DATABASE_PROFILE to "performance" to serve concurrent requests: WAL journaling, so readers don't block the
+# writer, persistent connections and write transactions that take the lock up front.
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
+
+if DATABASE_PROFILE == "performance":
+    DATABASES['default'] |= {
+        'ENGINE': 'iati_shopping_cart.db_backends.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv("DATABASE_CONN_MAX_AGE", "600")),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+            },
+        },
+    }
+
+# Set DATABASE_REPLICAS to the comma separated paths of replicas of the default database, the catalog and cart GET
+# endpoints read from them. Locally `python manage.py refresh_replicas` copies the default database into them.
+DATABASE_REPLICA_ALIASES = []
+
+for i, replica_name in enumerate(filter(None, os.getenv("DATABASE_REPLICAS", "").split(","))):
+    DATABASE_REPLICA_ALIASES.append(f"replica_{i}")
+    DATABASES[f"replica_{i}"] = DATABASES['default'] | {'NAME': replica_name, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['products.replicas.ReplicaRouter']
+
+# Number of seconds the reads of a client go to the default database after it writes, so it sees its writes.
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CACHE_LOCATION", ''),
+    }
+}
+
+# Number of seconds the catalog responses are cached.
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
+
+
+# Request timing
+# Maximum number of SQL queries of a request to each view, by view name. Requests over budget are logged, or
+# fail with QUERY_BUDGET_ACTION=raise.
+QUERY_BUDGETS = {
+    'products:product-list-create': 6,
+    'products:product-retrieve-update-destroy': 6,
+    'products:add-product-view': 12,
+    'products:add-products-view': 12,
+    'products:view-cart-view': 4,
+    'products:order-view': 6,
+    'products:async-product-list': 2,
+    'products:async-product-retrieve': 2,
+    'products:async-view-cart': 4,
+    'products:async-order-view': 6,
+}
+
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "log")
+
+# Set TRACE_RECORD_FILE to append a JSON line per request to it, `python manage.py replay_traces` replays them.
+TRACE_RECORD_FILE = os.getenv("TRACE_RECORD_FILE", "")
+
+# Profiling
+# Set PROFILING_DIR and at least one trigger to profile requests: the X-Profile header with the PROFILING_TOKEN,
+# a fraction of the requests with PROFILING_SAMPLE_RATE or the requests slower than PROFILING_LATENCY_THRESHOLD
+# milliseconds.
+PROFILING_DIR = os.getenv("PROFILING_DIR", "")
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_LATENCY_THRESHOLD = float(os.getenv("PROFILING_LATENCY_THRESHOLD", "0"))
+# Seconds between samples of the stack of a profiled request.
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+# Number of profiles kept, the oldest ones are deleted.
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
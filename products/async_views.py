@@ -0,0 +1,158 @@
+"""Create your async views here.
+
+They serve the catalog reads, the shopping cart and the order without holding a thread per request under ASGI.
+Their responses have the same content as the ones of the views in `products.views`.
+"""
+
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import HttpRequest, HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ParseError, ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from products.cache import aget_catalog_version, aget_or_build, get_catalog_cache_key
+from products.conditional import (
+    add_validator_headers, aget_catalog_validators, aget_product_validators, get_not_modified_response
+)
+from products.fieldsets import get_requested_fields, limit_to_fields
+from products.models import Product, ShoppingCart, CartItem
+from products.pagination import ProductCursorPagination
+from products.serializers import (
+    ProductListCreateSerializer, ProductRetrieveUpdateDestroySerializer, CartItemSerializer, OrderSerializer
+)
+from products.timing import timed
+from products.views import place_order
+
+
+def render(data: dict, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """Render the data as the `JSONRenderer` of the sync views does.
+    """
+
+    with timed("render"):
+        content = JSONRenderer().render(data)
+
+    return HttpResponse(content, status=status_code, content_type=JSONRenderer.media_type)
+
+
+async def aget_shopping_cart_data(today: date) -> dict:
+    """Async version of `products.views.get_shopping_cart_data`.
+    """
+
+    data = {}
+    try:
+        shopping_cart = await ShoppingCart.objects.annotate(
+            total_products=Coalesce(Sum("cartitem__quantity"), 0)
+        ).aget(created_on=today, purchased=False)
+    except ShoppingCart.DoesNotExist:
+        data["products"] = []
+        data["total_products"] = 0
+    else:
+        cart_items = CartItem.objects.filter(shopping_cart=shopping_cart).select_related("product").order_by("id")
+        data["products"] = CartItemSerializer([cart_item async for cart_item in cart_items], many=True).data
+        data["total_products"] = shopping_cart.total_products
+
+    return data
+
+
+class ProductList(View):
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        # Checked before the fields, as the sync views do.
+        validators = await aget_catalog_validators()
+        response = get_not_modified_response(request, validators)
+        if response is not None:
+            return add_validator_headers(response, validators)
+
+        try:
+            fields = get_requested_fields(request.GET)
+        except ValidationError as error:
+            return render(error.detail, status.HTTP_400_BAD_REQUEST)
+
+        async def build():
+            paginator = ProductCursorPagination()
+            page = await paginator.apaginate_queryset(
+                limit_to_fields(Product.objects.with_subclasses().available(), fields, paginator.ordering),
+                Request(request)
+            )
+            data = ProductListCreateSerializer(page, many=True, context={"fields": fields}).data
+
+            return paginator.get_paginated_response(data).data
+
+        cache_key = get_catalog_cache_key(request, await aget_catalog_version())
+
+        try:
+            data = await aget_or_build(cache_key, build, settings.CATALOG_CACHE_TIMEOUT)
+        except NotFound as error:
+            return render({"detail": error.detail}, status.HTTP_404_NOT_FOUND)
+
+        return add_validator_headers(render(data), validators)
+
+
+class ProductRetrieve(View):
+    async def get(self, request: HttpRequest, pk: str) -> HttpResponse:
+        # Checked before the fields, as the sync views do.
+        validators = await aget_product_validators(pk)
+        response = get_not_modified_response(request, validators)
+        if response is not None:
+            return add_validator_headers(response, validators)
+
+        try:
+            fields = get_requested_fields(request.GET)
+        except ValidationError as error:
+            return render(error.detail, status.HTTP_400_BAD_REQUEST)
+
+        async def build():
+            try:
+                product = await limit_to_fields(Product.objects.with_subclasses().available(), fields).aget(pk=pk)
+            except Product.DoesNotExist:
+                return None
+
+            return ProductRetrieveUpdateDestroySerializer(product, context={"fields": fields}).data
+
+        cache_key = get_catalog_cache_key(request, await aget_catalog_version())
+        data = await aget_or_build(cache_key, build, settings.CATALOG_CACHE_TIMEOUT)
+
+        if data is None:
+            return render({"detail": NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+
+        return add_validator_headers(render(data), validators)
+
+
+class ShoppingCartView(View):
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        today = datetime.utcnow().today()
+
+        return render(await aget_shopping_cart_data(today))
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class OrderView(View):
+    parsers = [JSONParser(), FormParser(), MultiPartParser()]
+
+    async def post(self, request: HttpRequest) -> HttpResponse:
+        today = datetime.utcnow().today()
+
+        try:
+            serializer = OrderSerializer(data=Request(request, parsers=self.parsers).data)
+        except ParseError as error:
+            return render({"detail": error.detail}, status.HTTP_400_BAD_REQUEST)
+
+        if not serializer.is_valid():
+            return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        # Row locks and transactions aren't available to the async ORM, the email is queued in the same transaction.
+        try:
+            await sync_to_async(place_order)(today, serializer.validated_data)
+        except ShoppingCart.DoesNotExist:
+            return render({"message": "There is no current shopping cart."}, status.HTTP_404_NOT_FOUND)
+
+        return render({"message": "Your order has been successfully processed."})
@@ -0,0 +1,178 @@
+"""Module to cache the catalog responses.
+
+Cached entries are keyed by a catalog version number that changes after every write to the products, so
+invalidating the whole catalog is a single increment and stale entries simply expire.
+"""
+
+import asyncio
+import time
+from hashlib import md5
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from products.replicas import primary_reads
+
+CATALOG_VERSION_KEY = "products:catalog:version"
+
+# How long the request rebuilding an entry keeps the lock, in seconds. It bounds how long other requests
+# wait for it if the process dies before releasing the lock.
+REBUILD_LOCK_TIMEOUT = 10
+# Interval between cache lookups of the requests waiting for an entry to be rebuilt, in seconds.
+REBUILD_POLL_INTERVAL = 0.05
+
+
+def get_catalog_version() -> int:
+    """Return the current catalog version, initializing it if it isn't cached.
+    """
+
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the current time, so a version lost on eviction never collides with a previous one.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+
+    return version
+
+
+def bump_catalog_version() -> None:
+    """Invalidate every cached catalog response.
+
+    The version is changed once the current transaction commits, so a request can't cache the data
+    previous to the write under the new version.
+    """
+
+    def bump():
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+async def aget_catalog_version() -> int:
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+
+    return version
+
+
+def get_catalog_cache_key(request: HttpRequest, version: int | None = None) -> str:
+    """Return the cache key of the response to the request, for the current catalog version if none is given.
+
+    The key includes the scheme and host, since the cached pagination links are absolute URLs.
+    """
+
+    if version is None:
+        version = get_catalog_version()
+
+    url_hash = md5(request.build_absolute_uri().encode(), usedforsecurity=False).hexdigest()
+    return f"products:catalog:{version}:{url_hash}"
+
+
+def get_or_build(key: str, build: Callable[[], Any], timeout: int) -> Any:
+    """Return the value cached under `key`, building it with `build` on a miss.
+
+    Only one caller rebuilds a missing entry, the others wait for it to be cached instead of hitting the
+    database with the same query. A None value returned by `build` isn't cached. The cached value is built from
+    the primary: the catalog version changes when the primary commits, a replica behind it would store data
+    previous to the write under the new version, until the entry expires.
+
+    Args:
+        key (str): The cache key.
+        build (Callable[[], Any]): Function that computes the value.
+        timeout (int): Number of seconds the value is cached.
+
+    Returns:
+        Any: The cached or built value.
+    """
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + REBUILD_LOCK_TIMEOUT
+
+    while not cache.add(lock_key, True, timeout=REBUILD_LOCK_TIMEOUT):
+        time.sleep(REBUILD_POLL_INTERVAL)
+
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        if time.monotonic() >= deadline:
+            # The rebuild is taking too long, don't make the request wait any longer.
+            return build()
+
+    try:
+        value = cache.get(key)
+        if value is None:
+            with primary_reads():
+                value = build()
+            if value is not None:
+                cache.set(key, value, timeout=timeout)
+    finally:
+        cache.delete(lock_key)
+
+    return value
+
+
+async def aget_or_build(key: str, build: Callable[[], Awaitable[Any]], timeout: int) -> Any:
+    """Async version of `get_or_build`, `build` is awaited.
+    """
+
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + REBUILD_LOCK_TIMEOUT
+
+    while not await cache.aadd(lock_key, True, timeout=REBUILD_LOCK_TIMEOUT):
+        await asyncio.sleep(REBUILD_POLL_INTERVAL)
+
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+
+        if time.monotonic() >= deadline:
+            return await build()
+
+    try:
+        value = await cache.aget(key)
+        if value is None:
+            with primary_reads():
+                value = await build()
+            if value is not None:
+                await cache.aset(key, value, timeout=timeout)
+    finally:
+        await cache.adelete(lock_key)
+
+    return value
+
+
+class CatalogCacheMixin:
+    """Cache the data of the successful GET responses of a catalog view.
+    """
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        responses = []
+
+        def build():
+            response = super(CatalogCacheMixin, self).get(request, *args, **kwargs)
+            responses.append(response)
+            return response.data if response.status_code == status.HTTP_200_OK else None
+
+        data = get_or_build(get_catalog_cache_key(request), build, settings.CATALOG_CACHE_TIMEOUT)
+
+        return responses[0] if responses else Response(data)
@@ -0,0 +1,128 @@
+"""Module to answer the conditional GETs of the catalog without building the responses.
+
+The validator of the product list is the latest `Product.updated_at`, deleted products included since products
+are only soft deleted, and the one of a product its `updated_at`. Each is read with a single indexed query and
+cached for the catalog version. A request whose `If-None-Match` or `If-Modified-Since` header matches them gets
+a 304 before the catalog responses are built.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from products.cache import aget_catalog_version, aget_or_build, get_catalog_version, get_or_build
+from products.models import Product
+
+# The ETag and the last modification time of a resource, None when they are unknown.
+Validators = tuple[str | None, datetime | None]
+
+
+def get_list_validators(updated_at: datetime | None) -> Validators:
+    if updated_at is None:
+        return None, None
+
+    return f"products-{updated_at.timestamp():.6f}", updated_at
+
+
+def get_detail_validators(pk: int | str, updated_at: datetime | None) -> Validators:
+    if updated_at is None:
+        return None, None
+
+    return f"product-{pk}-{updated_at.timestamp():.6f}", updated_at
+
+
+def get_validators_cache_key(version: int, pk: int | str | None = None) -> str:
+    return f"products:catalog:{version}:validators" + (f":{pk}" if pk is not None else "")
+
+
+def get_catalog_validators() -> Validators:
+    """Return the validators of the product list, the same for all its pages and fields.
+
+    Like the responses, they are cached for the current catalog version, so the aggregate only runs once per write.
+    """
+
+    def build():
+        return get_list_validators(Product.objects.aggregate(updated_at=Max("updated_at"))["updated_at"])
+
+    return get_or_build(get_validators_cache_key(get_catalog_version()), build, settings.CATALOG_CACHE_TIMEOUT)
+
+
+def get_product_validators(pk: int | str) -> Validators:
+    """Return the validators of an available product, None if it doesn't exist or is deleted.
+    """
+
+    def build():
+        updated_at = Product.objects.available().filter(pk=pk).values_list("updated_at", flat=True).first()
+        return get_detail_validators(pk, updated_at)
+
+    return get_or_build(get_validators_cache_key(get_catalog_version(), pk), build, settings.CATALOG_CACHE_TIMEOUT)
+
+
+async def aget_catalog_validators() -> Validators:
+    async def build():
+        return get_list_validators((await Product.objects.aaggregate(updated_at=Max("updated_at")))["updated_at"])
+
+    cache_key = get_validators_cache_key(await aget_catalog_version())
+    return await aget_or_build(cache_key, build, settings.CATALOG_CACHE_TIMEOUT)
+
+
+async def aget_product_validators(pk: int | str) -> Validators:
+    async def build():
+        updated_at = await Product.objects.available().filter(pk=pk).values_list("updated_at", flat=True).afirst()
+        return get_detail_validators(pk, updated_at)
+
+    cache_key = get_validators_cache_key(await aget_catalog_version(), pk)
+    return await aget_or_build(cache_key, build, settings.CATALOG_CACHE_TIMEOUT)
+
+
+def get_not_modified_response(request: HttpRequest, validators: Validators) -> HttpResponse | None:
+    """Return the 304, or 412, response to the conditional request, None if the response must be built.
+    """
+
+    etag, last_modified = validators
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def add_validator_headers(response: HttpResponse, validators: Validators) -> HttpResponse:
+    """Send the validators in the `ETag` and `Last-Modified` headers of a successful or 304 response.
+    """
+
+    etag, last_modified = validators
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        if etag:
+            response.headers.setdefault("ETag", quote_etag(etag))
+        if last_modified:
+            response.headers.setdefault("Last-Modified", http_date(int(last_modified.timestamp())))
+
+    return response
+
+
+class ConditionalGetMixin:
+    """Answer the GET requests of a catalog view with a 304 when the client already has the response.
+
+    The validators are read before the response is built, so a write in between makes the client's
+    validators stale instead of leaving it with a stale response.
+    """
+
+    def get_validators(self, request: Request, *args, **kwargs) -> Validators:
+        raise NotImplementedError
+
+    def get(self, request: Request, *args, **kwargs) -> Response | HttpResponse:
+        validators = self.get_validators(request, *args, **kwargs)
+
+        response = get_not_modified_response(request, validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        return add_validator_headers(response, validators)
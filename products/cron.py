@@ -1,23 +1,121 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-from products.models import Product, CartItem
+from products.cache import bump_catalog_version
+from products.models import Product, CartItem, JobWatermark, StockMovement, StockSnapshot
+
+STOCK_RECONCILIATION_JOB = "update_product_stock"
+
+# Maximum number of product ids per UPDATE, below the SQLite limit of query parameters.
+UPDATE_BATCH_SIZE = 900
+
+# The cart activity since the previous run is looked up from this long before it. A cart line is timestamped
+# before its transaction commits, so one committed after the previous run read the carts can be older than it.
+WATERMARK_SAFETY_MARGIN = timedelta(minutes=5)
+
+
+def get_changed_product_ids(since: datetime, today: date) -> set[int]:
+    """Return the ids of the products whose reserved quantity may have changed since the given moment.
+
+    That is, the products of the cart items added or modified, of the shopping carts purchased and of the
+    shopping carts abandoned (not purchased before their day ended) since then.
+    """
+
+    changed_items = CartItem.objects.filter(updated_at__gt=since)
+    changed_carts = CartItem.objects.filter(shopping_cart__updated_at__gt=since)
+    abandoned_carts = CartItem.objects.filter(
+        shopping_cart__purchased=False,
+        shopping_cart__created_on__gte=since.date(),
+        shopping_cart__created_on__lt=today
+    )
+
+    # Deduplicated here rather than with DISTINCT, which would make SQLite scan a whole index to avoid sorting.
+    return {
+        product_id
+        for queryset in (changed_items, changed_carts, abandoned_carts)
+        for product_id in queryset.values_list("product_id", flat=True)
+    }
 
 
 def update_product_stock() -> None:
     """Update the products stock getting all cart items that are in a purchased shopping cart
     or in the current shopping cart. This function is executed by a cron jobs every hour.
+
+    Only the products with cart activity since the previous execution, or in any cart on the first one, are
+    updated. Their reserved quantity is computed in the database and the difference with their current stock is
+    recorded in the stock ledger.
     """
 
-    products_quantity = CartItem.objects.filter(
-        Q(shopping_cart__purchased=True) | Q(shopping_cart__created_on=datetime.utcnow().today())
-    ).values('product_id').annotate(total=Sum('quantity'))
+    now = timezone.now()
+    today = datetime.utcnow().date()
 
-    products = Product.objects.filter(
-        id__in=[product_quantity["product_id"] for product_quantity in products_quantity]
-    )
+    reserved_quantity = CartItem.objects.filter(
+        Q(shopping_cart__purchased=True) | Q(shopping_cart__created_on=today),
+        product_id=OuterRef("pk")
+    ).values("product_id").annotate(total=Sum("quantity")).values("total")
+
+    with transaction.atomic():
+        watermark, created = JobWatermark.objects.select_for_update().get_or_create(
+            job=STOCK_RECONCILIATION_JOB, defaults={"processed_until": now}
+        )
+
+        if created:
+            # Only the products in some cart, the stock of the others may have been restocked by hand.
+            products_batches = [Product.objects.filter(id__in=CartItem.objects.values("product_id"))]
+        else:
+            product_ids = sorted(get_changed_product_ids(watermark.processed_until - WATERMARK_SAFETY_MARGIN, today))
+            products_batches = [
+                Product.objects.filter(id__in=product_ids[i:i + UPDATE_BATCH_SIZE])
+                for i in range(0, len(product_ids), UPDATE_BATCH_SIZE)
+            ]
+
+        for products in products_batches:
+            products = list(products.select_for_update().annotate(
+                new_stock=F("initial_stock") - Coalesce(Subquery(reserved_quantity), 0)
+            ).exclude(current_stock=F("new_stock")).only("id", "current_stock"))
+
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    product=product,
+                    quantity=product.new_stock - product.current_stock,
+                    reason=StockMovement.RECONCILIATION
+                )
+                for product in products
+            ])
+
+            for product in products:
+                product.current_stock = product.new_stock
+            Product.objects.bulk_update(products, ["current_stock"])
+
+        watermark.processed_until = now
+        watermark.save(update_fields=["processed_until"])
+
+    bump_catalog_version()
+
+
+def take_stock_snapshots(batch_size: int = 1000) -> None:
+    """Store the stock of every product with movements since its latest snapshot, so rebuilding the stock
+    from the ledger only has to add up the movements after it. This function is executed by a cron job
+    every day.
+    """
+
+    last_id = 0
+
+    while True:
+        products = list(
+            Product.objects.with_ledger_stock().filter(
+                id__gt=last_id, last_movement_id__gt=F("snapshot_movement_id")
+            ).order_by("id").values_list("id", "ledger_stock", "last_movement_id")[:batch_size]
+        )
+        if not products:
+            return
 
-    for i, product in enumerate(products):
-        product.current_stock = product.initial_stock - products_quantity[i]["total"]
-        product.save(update_fields=["current_stock"])
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(product_id=product_id, stock=stock, last_movement_id=last_movement_id)
+            for product_id, stock, last_movement_id in products
+        ])
+        last_id = products[-1][0]
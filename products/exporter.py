@@ -0,0 +1,84 @@
+"""Module to export the catalog.
+
+The products are read with a chunked iterator and each row is compressed as soon as it's serialized, so the
+memory used doesn't depend on the size of the catalog. Rows are rendered by `ProductListCreateSerializer`,
+the same as the products endpoint.
+"""
+
+import csv
+import json
+import zlib
+from io import StringIO
+from typing import Iterator
+
+from products.formats import NDJSON
+from products.models import Product
+from products.serializers import CapSerializer, TshirtSerializer, ProductListCreateSerializer
+
+# The wbits value that makes zlib write a gzip header and trailer.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_export_columns() -> list[str]:
+    """Return the fields rendered by `ProductListCreateSerializer` for any product type, in output order.
+    """
+
+    columns = {}
+    for serializer in (ProductListCreateSerializer(), CapSerializer(), TshirtSerializer()):
+        columns |= {name: None for name, field in serializer.fields.items() if not field.write_only}
+
+    return list(columns)
+
+
+class CatalogExporter:
+    """Iterate the available products as gzip compressed NDJSON or CSV chunks.
+    """
+
+    def __init__(self, format: str, chunk_size: int = 1000):
+        self.format = format
+        self.chunk_size = chunk_size
+        self.exported = 0
+
+        self.serializer = ProductListCreateSerializer()
+
+    def __iter__(self) -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=GZIP_WBITS)
+
+        for line in self.iter_lines():
+            chunk = compressor.compress(line.encode())
+            if chunk:
+                yield chunk
+
+        yield compressor.flush()
+
+    def iter_rows(self) -> Iterator[dict]:
+        products = Product.objects.with_subclasses().available().order_by("id")
+
+        for product in products.iterator(chunk_size=self.chunk_size):
+            self.exported += 1
+            yield self.serializer.to_representation(product)
+
+    def iter_lines(self) -> Iterator[str]:
+        if self.format == NDJSON:
+            for row in self.iter_rows():
+                yield json.dumps(row, separators=(",", ":")) + "\n"
+            return
+
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=get_export_columns())
+
+        def flush() -> str:
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return line
+
+        writer.writeheader()
+        yield flush()
+
+        for row in self.iter_rows():
+            # The composition is written as JSON, so the file can be imported back.
+            if "composition" in row:
+                row["composition"] = json.dumps(row["composition"])
+            writer.writerow(row)
+            yield flush()
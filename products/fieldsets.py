@@ -0,0 +1,85 @@
+"""Module to let clients choose the fields of the product responses.
+
+With `?fields=id,unit_price`, a GET request only gets those fields, and the queryset only fetches the columns
+and joins the subclass tables they need, so the other fields are never loaded nor serialized.
+"""
+
+from functools import cache
+from typing import Iterable
+
+from django.db.models import QuerySet
+from django.http import QueryDict
+from rest_framework import serializers
+
+from products.exporter import get_export_columns
+
+FIELDS_QUERY_PARAM = "fields"
+
+
+@cache
+def get_product_fields() -> tuple[str, ...]:
+    """Return the fields of a product response, for any product type.
+    """
+
+    return tuple(get_export_columns())
+
+
+def parse_fields(value: str) -> set[str]:
+    """Return the set of fields of a comma separated `fields` query parameter.
+
+    Raises:
+        ValidationError: If there are no fields or some of them aren't fields of a product.
+    """
+
+    fields = {name.strip() for name in value.split(",") if name.strip()}
+    if not fields:
+        raise serializers.ValidationError({FIELDS_QUERY_PARAM: ["At least one field is required."]})
+
+    invalid_fields = fields - set(get_product_fields())
+    if invalid_fields:
+        raise serializers.ValidationError(
+            {FIELDS_QUERY_PARAM: [f"{', '.join(sorted(invalid_fields))} are not valid fields."]}
+        )
+
+    return fields
+
+
+def get_requested_fields(query_params: QueryDict) -> set[str] | None:
+    """Return the fields requested in the query parameters, None if there is no `fields` parameter.
+    """
+
+    value = query_params.get(FIELDS_QUERY_PARAM)
+    return None if value is None else parse_fields(value)
+
+
+def limit_to_fields(queryset: QuerySet, fields: set[str] | None, ordering: Iterable[str] = ()) -> QuerySet:
+    """Limit a product queryset to the given fields plus the `ordering` ones, when there are fields.
+    """
+
+    if fields is None:
+        return queryset
+
+    return queryset.with_fields(fields | {field.lstrip("-") for field in ordering})
+
+
+class SparseFieldsViewMixin:
+    """Restrict the fields of the GET responses of a product view with the `fields` query parameter.
+
+    The fields are passed to the serializers in their context, see `SparseFieldsSerializerMixin`, and the
+    queryset is limited to them with `ProductQuerySet.with_fields`, plus the fields the pagination orders by.
+    """
+
+    def get_requested_fields(self) -> set[str] | None:
+        request = getattr(self, "request", None)
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None
+
+        return get_requested_fields(request.query_params)
+
+    def get_queryset(self) -> QuerySet:
+        return limit_to_fields(
+            super().get_queryset(), self.get_requested_fields(), getattr(self.paginator, "ordering", ())
+        )
+
+    def get_serializer_context(self) -> dict:
+        return super().get_serializer_context() | {"fields": self.get_requested_fields()}
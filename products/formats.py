@@ -0,0 +1,7 @@
+"""Module with the file formats of the catalog imports and exports.
+"""
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+FORMATS = [NDJSON, CSV]
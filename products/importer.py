@@ -0,0 +1,178 @@
+"""Module to import products in bulk.
+
+Rows are validated with the same serializers used by the products endpoint, and the valid ones are inserted in
+batches: a `bulk_create` of the `Product` rows followed by an `executemany` INSERT per subclass table, since
+`bulk_create` doesn't support multi-table inheritance.
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from django.db import connections, router, transaction
+from rest_framework import serializers
+
+from products.cache import bump_catalog_version
+from products.formats import NDJSON
+from products.models import Product, Cap, Tshirt
+from products.serializers import CapSerializer, TshirtSerializer, ProductListCreateSerializer
+
+
+@dataclass
+class ImportReport:
+    """Result of an import, errors hold the 1-based number of the row and its validation errors.
+    """
+
+    created: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[dict | None]:
+    """Yield the object of each line of a NDJSON stream, None for the lines that aren't a JSON object.
+    """
+
+    for line in stream:
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+
+        yield row if isinstance(row, dict) else None
+
+
+def read_csv(stream: IO[str]) -> Iterator[dict]:
+    """Yield each row of a CSV stream with a header, skipping the empty cells and decoding the composition.
+    """
+
+    for row in csv.DictReader(stream):
+        row = {key: value for key, value in row.items() if value not in ("", None)}
+
+        if "composition" in row:
+            try:
+                row["composition"] = json.loads(row["composition"])
+            except ValueError:
+                pass
+
+        yield row
+
+
+class ProductImporter:
+    """Validate and insert products `batch_size` rows at a time.
+    """
+
+    SUBCLASSES = {Product.CAP: (Cap, CapSerializer), Product.TSHIRT: (Tshirt, TshirtSerializer)}
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+        # The serializers are built once and reused for every row, building their fields is the expensive part.
+        self.product_serializer = ProductListCreateSerializer()
+        self.subclass_serializers = {
+            product_type: serializer_class() for product_type, (_, serializer_class) in self.SUBCLASSES.items()
+        }
+
+    def import_stream(self, stream: IO[str], format: str) -> ImportReport:
+        rows = read_ndjson(stream) if format == NDJSON else read_csv(stream)
+        return self.import_rows(rows)
+
+    def import_rows(self, rows: Iterable[dict | None]) -> ImportReport:
+        report = ImportReport()
+        numbered_rows = enumerate(rows, start=1)
+
+        while batch := list(islice(numbered_rows, self.batch_size)):
+            products = []
+            for row_number, row in batch:
+                try:
+                    products.append(self.build_product(row))
+                except serializers.ValidationError as error:
+                    report.errors.append({"row": row_number, "errors": error.detail})
+
+            report.created += self.insert(products)
+
+        if report.created:
+            bump_catalog_version()
+
+        return report
+
+    def build_product(self, row: dict | None) -> Cap | Tshirt:
+        """Validate a row like `ProductListCreateSerializer.create` does and return the unsaved product.
+        """
+
+        if row is None:
+            raise serializers.ValidationError({"non_field_errors": ["Invalid JSON object."]})
+
+        errors = {}
+
+        try:
+            validated_data = self.product_serializer.run_validation(row)
+        except serializers.ValidationError as error:
+            errors |= error.detail
+            validated_data = {}
+
+        product_type = validated_data.get("product_type", str(row.get("product_type", "")).capitalize())
+        if product_type in self.subclass_serializers:
+            try:
+                validated_data |= self.subclass_serializers[product_type].run_validation(row)
+            except serializers.ValidationError as error:
+                errors |= error.detail
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        model = self.SUBCLASSES[product_type][0]
+        product = model(**validated_data, current_stock=validated_data["initial_stock"])
+        product.type_rank = Product.TYPE_RANKS[product_type]
+        product.description = product.build_description()
+
+        return product
+
+    @staticmethod
+    def insert(products: list[Cap | Tshirt]) -> int:
+        if not products:
+            return 0
+
+        parent_fields = [model_field for model_field in Product._meta.concrete_fields if not model_field.primary_key]
+
+        with transaction.atomic():
+            parents = Product.objects.bulk_create([
+                Product(**{model_field.attname: getattr(product, model_field.attname) for model_field in parent_fields})
+                for product in products
+            ])
+
+            for product, parent in zip(products, parents):
+                product.id = product.product_ptr_id = parent.pk
+
+            for model, _ in ProductImporter.SUBCLASSES.values():
+                insert_subclass_rows(model, [product for product in products if type(product) is model])
+
+        return len(products)
+
+
+def insert_subclass_rows(model: type[Product], products: list[Product]) -> None:
+    """Insert the rows of the subclass table of already saved products with a single statement per batch.
+    """
+
+    if not products:
+        return
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    model_fields = model._meta.local_concrete_fields
+
+    columns = ", ".join(quote_name(model_field.column) for model_field in model_fields)
+    placeholders = ", ".join(["%s"] * len(model_fields))
+    sql = f"INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [
+                model_field.get_db_prep_save(getattr(product, model_field.attname), connection)
+                for model_field in model_fields
+            ]
+            for product in products
+        ])
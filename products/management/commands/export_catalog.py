@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.exporter import CatalogExporter
+from products.formats import CSV, FORMATS, NDJSON
+
+
+class Command(BaseCommand):
+    help = "Export the available products to a gzip compressed NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="The file to write, e.g. catalog.ndjson.gz.")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="The format of the file, by default taken from its extension."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Number of products fetched from the database at a time."
+        )
+
+    def handle(self, *args, **options):
+        path: Path = options["path"]
+        file_format = options["format"] or (CSV if ".csv" in path.suffixes else NDJSON)
+        exporter = CatalogExporter(file_format, chunk_size=options["chunk_size"])
+
+        try:
+            with path.open("wb") as file:
+                for chunk in exporter:
+                    file.write(chunk)
+        except OSError as error:
+            raise CommandError(f"Cannot write {path}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {exporter.exported} products to {path}."))
@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.formats import CSV, FORMATS, NDJSON
+from products.importer import ProductImporter
+
+
+class Command(BaseCommand):
+    help = "Import products in bulk from a NDJSON or CSV file, reporting the rows that aren't valid."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="The file to import.")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="The format of the file, by default taken from its extension."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Number of rows validated and inserted at a time."
+        )
+
+    def handle(self, *args, **options):
+        path: Path = options["path"]
+        file_format = options["format"] or (CSV if path.suffix.lower() == ".csv" else NDJSON)
+
+        try:
+            with path.open(encoding="utf-8", newline="") as stream:
+                report = ProductImporter(batch_size=options["batch_size"]).import_stream(stream, file_format)
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+
+        for error in report.errors:
+            self.stderr.write(json.dumps(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} products, {len(report.errors)} rows with errors."
+        ))
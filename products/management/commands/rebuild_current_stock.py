@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_catalog_version
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the current stock of every product from the stock ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Number of products loaded and updated per query."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = 0
+        last_id = 0
+
+        while True:
+            products = Product.objects.with_ledger_stock().filter(id__gt=last_id).order_by("id")
+            products = list(products.only("id", "current_stock")[:batch_size])
+            if not products:
+                break
+
+            changed_products = [product for product in products if product.current_stock != product.ledger_stock]
+            for product in changed_products:
+                product.current_stock = product.ledger_stock
+
+            updated += Product.objects.bulk_update(changed_products, ["current_stock"])
+            last_id = products[-1].id
+
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the current stock of {updated} products."))
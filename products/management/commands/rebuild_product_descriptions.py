@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_catalog_version
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Render again the stored description of every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Number of products loaded and updated per query."
+        )
+
+    def handle(self, *args, **options):
+        updated = Product.objects.rebuild_descriptions(batch_size=options["batch_size"])
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the description of {updated} products."))
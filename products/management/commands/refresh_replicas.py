@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.replicas import get_replica_aliases, refresh_replica
+
+
+class Command(BaseCommand):
+    help = "Copy the default SQLite database into the files of the replicas, to stand in for replication locally."
+
+    def handle(self, *args, **options):
+        replica_aliases = get_replica_aliases()
+
+        for alias in replica_aliases:
+            connections[alias].close()
+            refresh_replica(connections[alias].settings_dict["NAME"])
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {len(replica_aliases)} replicas."))
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.traces import HttpSender, InProcessSender, read_postman_collection, read_traces, replay
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay request traces, recorded with TRACE_RECORD_FILE or from a Postman collection, and report the "
+        "throughput and latency of each route."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", type=Path, help="A JSON lines file of traces, or a Postman collection if it ends with .json."
+        )
+        parser.add_argument(
+            "--target",
+            help="Base URL of a running server, e.g. http://localhost:8000. By default the requests are made in "
+                 "process through the test client, against the configured database."
+        )
+        parser.add_argument("--concurrency", type=int, default=1, help="Number of requests in flight at a time.")
+        parser.add_argument(
+            "--rate", type=float, help="Requests per second to send, as fast as possible by default."
+        )
+        parser.add_argument("--repeat", type=int, default=1, help="Number of times the traces are replayed.")
+        parser.add_argument(
+            "--variable", action="append", default=[], metavar="NAME=VALUE",
+            help="Value of a variable of the Postman collection, e.g. pk=5. Can be given several times."
+        )
+        parser.add_argument("--json", action="store_true", help="Write the report as JSON.")
+
+    def handle(self, *args, **options):
+        traces = self.load_traces(options["path"], options["variable"])
+        send = HttpSender(options["target"]) if options["target"] else InProcessSender()
+
+        reports, elapsed = replay(traces * options["repeat"], send, options["concurrency"], options["rate"])
+        summaries = {route: report.summary(elapsed) for route, report in sorted(reports.items())}
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"elapsed": elapsed, "routes": summaries}, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'route':<44}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for route, summary in summaries.items():
+            self.stdout.write(
+                f"{route:<44}{summary['requests']:>9}{summary['errors']:>8}{summary['throughput']:>9.1f}"
+                f"{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f}"
+            )
+        self.stdout.write(f"Replayed {len(traces) * options['repeat']} requests in {elapsed:.1f}s.")
+
+    @staticmethod
+    def load_traces(path: Path, variables: list[str]) -> list[dict]:
+        try:
+            with path.open() as file:
+                if path.suffix == ".json":
+                    return read_postman_collection(
+                        json.load(file), dict(variable.split("=", 1) for variable in variables)
+                    )
+                return list(read_traces(file))
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        except (ValueError, KeyError) as error:
+            raise CommandError(f"Invalid traces in {path}: {error}")
@@ -0,0 +1,82 @@
+import hashlib
+from pathlib import Path
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from products.cache import bump_catalog_version
+from products.models import AppliedFixture, Product, StockMovement
+
+INITIAL_FIXTURE = "initial_stock.yaml"
+
+
+def get_fixture_fingerprint(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_fixture_product_ids(path: Path) -> set[int]:
+    with path.open() as stream:
+        return {obj.object.pk for obj in serializers.deserialize("yaml", stream) if isinstance(obj.object, Product)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the initial products fixture unless the same version of it was already loaded. "
+        "Run it after migrate when deploying, it's not run on startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Load the fixture even if this version of it was already loaded."
+        )
+
+    def handle(self, *args, **options):
+        path = Path(apps.get_app_config("products").path) / "fixtures" / INITIAL_FIXTURE
+
+        try:
+            fingerprint = get_fixture_fingerprint(path)
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+
+        with transaction.atomic():
+            applied_fixture = AppliedFixture.objects.select_for_update().filter(name=INITIAL_FIXTURE).first()
+
+            if applied_fixture and applied_fixture.fingerprint == fingerprint and not options["force"]:
+                self.stdout.write(f"{INITIAL_FIXTURE} is already loaded, skipping it.")
+                return
+
+            # Loading the fixture overwrites the stored rows, the stock of the products already loaded is live data
+            # so it's kept, only the new products get the stock of the fixture.
+            product_ids = get_fixture_product_ids(path)
+            stored_stocks = list(
+                Product.objects.filter(id__in=product_ids).values_list("id", "current_stock", "initial_stock")
+            )
+            call_command("loaddata", INITIAL_FIXTURE, verbosity=0)
+            Product.objects.bulk_update([
+                Product(id=product_id, current_stock=current_stock, initial_stock=initial_stock)
+                for product_id, current_stock, initial_stock in stored_stocks
+            ], ["current_stock", "initial_stock"])
+
+            products = Product.objects.filter(id__in=product_ids)
+            new_products = products.exclude(id__in=[product_id for product_id, _, _ in stored_stocks])
+
+            # loaddata doesn't record the stock it sets, the difference with the ledger is recorded as an adjustment.
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    product_id=product.id,
+                    quantity=product.current_stock - product.ledger_stock,
+                    reason=StockMovement.ADJUSTMENT
+                )
+                for product in new_products.with_ledger_stock().only("id", "current_stock")
+                if product.current_stock != product.ledger_stock
+            ])
+            # The rows keep the `updated_at` of the fixture, touch them so clients revalidate the loaded products.
+            products.update(updated_at=timezone.now())
+            AppliedFixture.objects.update_or_create(name=INITIAL_FIXTURE, defaults={"fingerprint": fingerprint})
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {INITIAL_FIXTURE} ({fingerprint[:12]})."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.outbox import MAX_ATTEMPTS, send_pending_emails
+
+
+class Command(BaseCommand):
+    help = "Send the pending emails of the outbox, reusing one mail server connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Number of emails sent per connection.")
+        parser.add_argument(
+            "--max-attempts", type=int, default=MAX_ATTEMPTS,
+            help="Number of attempts after which an email is marked as failed."
+        )
+        parser.add_argument(
+            "--interval", type=float,
+            help="Keep running, checking the outbox every given number of seconds when it's empty."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = self.send_batches(options["batch_size"], options["max_attempts"])
+            if sent or options["interval"] is None:
+                self.stdout.write(f"Sent {sent} emails.")
+
+            if options["interval"] is None:
+                return
+
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def send_batches(batch_size: int, max_attempts: int) -> int:
+        sent = 0
+        while batch_sent := send_pending_emails(batch_size, max_attempts):
+            sent += batch_sent
+
+        return sent
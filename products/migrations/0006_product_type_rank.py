@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+TYPE_RANKS = {"Cap": 1, "Tshirt": 2}
+
+
+def backfill_type_rank(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    for product_type, type_rank in TYPE_RANKS.items():
+        Product.objects.filter(product_type=product_type).update(type_rank=type_rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_alter_cartitem_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='type_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_type_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_deleted', 'type_rank', '-inclusion_date', 'id'], name='product_catalog_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+def backfill_description(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Tshirt = apps.get_model("products", "Tshirt")
+
+    tshirts = {tshirt.pk: tshirt for tshirt in Tshirt.objects.all()}
+    products = list(Product.objects.all())
+
+    for product in products:
+        product.description = f"{product.main_color} {product.brand} {product.product_type} with secondary " \
+                              f"colors {product.secondary_colors}, included in the catalog in the year " \
+                              f"{product.inclusion_date.year}"
+
+        tshirt = tshirts.get(product.pk)
+        if tshirt is not None:
+            composition_display = ", ".join([f"{m}: {p}%" for m, p in tshirt.composition.items()])
+            product.description += f", size {tshirt.size}, composition {composition_display}"
+
+    Product.objects.bulk_update(products, ["description"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_type_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='description',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(backfill_description, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100, unique=True)),
+                ('processed_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_opening_snapshots(apps, schema_editor, batch_size=1000):
+    # The stock sold and restocked before the ledger existed has no movements, each product starts the ledger
+    # with a snapshot of its current stock.
+    Product = apps.get_model("products", "Product")
+    StockSnapshot = apps.get_model("products", "StockSnapshot")
+    last_id = 0
+
+    while True:
+        products = Product.objects.filter(id__gt=last_id).order_by("id").values_list("id", "current_stock")
+        products = list(products[:batch_size])
+        if not products:
+            return
+
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(product_id=product_id, stock=current_stock, last_movement_id=0)
+            for product_id, current_stock in products
+        ])
+        last_id = products[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_incremental_stock_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('AddToCart', 'AddToCart'), ('Adjustment', 'Adjustment'), ('Reconciliation', 'Reconciliation')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['product', '-last_movement_id'], name='stock_snapshot_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'id'], name='stock_movement_product_idx'),
+        ),
+        migrations.RunPython(seed_opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedFixture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['shopping_cart', 'product'], name='cart_item_cart_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['updated_at', 'product'], name='cart_item_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(condition=models.Q(('purchased', False)), fields=['created_on'], name='shopping_cart_open_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='shopping_cart',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='products.shoppingcart'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:39
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model("products", "CartItem")
+    duplicates = CartItem.objects.values("shopping_cart_id", "product_id").annotate(
+        lines=Count("id"), first_id=Min("id"), total_quantity=Sum("quantity")
+    ).filter(lines__gt=1)
+
+    for duplicate in duplicates:
+        lines = CartItem.objects.filter(
+            shopping_cart_id=duplicate["shopping_cart_id"], product_id=duplicate["product_id"]
+        )
+        lines.filter(id=duplicate["first_id"]).update(quantity=duplicate["total_quantity"])
+        lines.exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('shopping_cart', 'product'), name='cart_item_cart_product_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='cartitem',
+            name='cart_item_cart_product_idx',
+        ),
+    ]
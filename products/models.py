@@ -1,8 +1,13 @@
 """Create your models here.
 """
 
-from django.db import models
+from functools import cache
+
+from django.db import connections, models
+from django.db.models import Case, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 def validate_tshirt_materials(composition: dict[str, float]) -> None:
@@ -43,6 +48,162 @@ def validate_percentages_sum(composition: dict[str, float]) -> None:
         raise ValidationError("The sum of the composition's percentage must be 100.")
 
 
+@cache
+def get_subclass_fields(product_type: str) -> frozenset[str]:
+    """Return the names of the fields stored in the subclass table of a product type.
+    """
+
+    model = Product._meta.get_field(product_type.lower()).related_model
+    return frozenset(model_field.name for model_field in model._meta.local_fields if not model_field.primary_key)
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet that defines the product specific lookups.
+    """
+
+    def with_subclasses(self) -> "ProductQuerySet":
+        """Join the Cap and Tshirt tables so the subclass rows are fetched in the same query.
+
+        Accessing `product.cap` or `product.tshirt` on the returned products doesn't hit the database.
+        """
+
+        return self.select_related(*(product_type.lower() for product_type in Product.PRODUCT_TYPES))
+
+    def available(self) -> "ProductQuerySet":
+        """Exclude the soft deleted products.
+
+        The filter is written as `is_deleted IN (false)` because SQLite compiles `is_deleted = false` to
+        `NOT is_deleted`, which can't be used to seek into the catalog index.
+        """
+
+        return self.filter(is_deleted__in=[False])
+
+    def with_fields(self, fields: set[str]) -> "ProductQuerySet":
+        """Fetch only the columns and join only the subclass tables needed to render the given fields.
+
+        It replaces `with_subclasses`, the subclass table of a product type is only joined if some of its
+        fields are requested. Accessing any other field of the returned products hits the database.
+        """
+
+        product_fields = {model_field.name for model_field in Product._meta.concrete_fields}
+        only_fields = {"id", *(fields & product_fields)}
+        subclasses = []
+
+        for product_type in Product.PRODUCT_TYPES:
+            subclass_fields = fields & get_subclass_fields(product_type)
+            if subclass_fields:
+                subclasses.append(product_type.lower())
+                only_fields |= {"product_type", *(f"{product_type.lower()}__{name}" for name in subclass_fields)}
+
+        return self.select_related(None).select_related(*subclasses).only(*only_fields)
+
+    def update(self, **kwargs) -> int:
+        """Update the products, setting their `updated_at` to now unless it's given.
+        """
+
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None) -> int:
+        """Update the given fields of the products, and their `updated_at` to now.
+        """
+
+        objs = tuple(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+
+        return super().bulk_update(objs, {*fields, "updated_at"}, batch_size=batch_size)
+
+    def decrement_stock(self, product_id: int, quantity: int) -> bool:
+        """Subtract `quantity` from the stock of a product with a single conditional UPDATE.
+
+        The stock is checked and changed by the database in the same statement, so concurrent decrements
+        can't oversell a product and no lock is held before the UPDATE.
+
+        Args:
+            product_id (int): The id of the product.
+            quantity (int): The quantity to subtract, negative to give back stock.
+
+        Returns:
+            bool: False, without changing anything, if the product is deleted or doesn't have enough stock.
+        """
+
+        return self.available().filter(id=product_id, current_stock__gte=quantity).update(
+            current_stock=F("current_stock") - quantity
+        ) == 1
+
+    def decrement_stocks(self, quantities: dict[int, int]) -> bool:
+        """Subtract the given quantities from the stock of several products with a single conditional UPDATE.
+
+        Args:
+            quantities (dict[int, int]): The quantity to subtract mapped by product id.
+
+        Returns:
+            bool: False if any of the products is deleted or doesn't have enough stock. The other products are
+            still updated, so the caller must roll back the transaction.
+        """
+
+        quantity = Case(
+            *(When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+            output_field=models.IntegerField()
+        )
+
+        return self.available().filter(id__in=quantities, current_stock__gte=quantity).update(
+            current_stock=F("current_stock") - quantity
+        ) == len(quantities)
+
+    def with_ledger_stock(self) -> "ProductQuerySet":
+        """Annotate the stock of each product computed from its stock ledger.
+
+        `ledger_stock` is the stock of the latest snapshot, or the initial stock if there is none, plus the
+        movements after it. `last_movement_id` is the id of the latest movement, 0 if there is none.
+        """
+
+        latest_snapshot = StockSnapshot.objects.filter(product=OuterRef("pk")).order_by("-last_movement_id")
+        movements = StockMovement.objects.filter(product=OuterRef("pk")).values("product")
+        movements_since_snapshot = movements.filter(
+            id__gt=OuterRef("snapshot_movement_id")
+        ).annotate(total=Sum("quantity")).values("total")
+
+        return self.annotate(
+            snapshot_stock=Subquery(latest_snapshot.values("stock")[:1]),
+            snapshot_movement_id=Coalesce(Subquery(latest_snapshot.values("last_movement_id")[:1]), 0),
+            ledger_stock=ExpressionWrapper(
+                Coalesce(F("snapshot_stock"), F("initial_stock"), output_field=models.IntegerField())
+                + Coalesce(Subquery(movements_since_snapshot), 0),
+                output_field=models.IntegerField()
+            ),
+            last_movement_id=Coalesce(Subquery(movements.annotate(last_id=Max("id")).values("last_id")), 0),
+        )
+
+    def rebuild_descriptions(self, batch_size: int = 1000) -> int:
+        """Render again the description of the products and store it, `batch_size` products at a time.
+
+        The products are walked by id, so memory usage doesn't depend on the number of products.
+
+        Args:
+            batch_size (int): Number of products loaded and updated per query.
+
+        Returns:
+            int: The number of updated products.
+        """
+
+        updated = 0
+        last_id = 0
+
+        while True:
+            products = list(self.with_subclasses().filter(id__gt=last_id).order_by("id")[:batch_size])
+            if not products:
+                return updated
+
+            for product in products:
+                product.description = (product.get_subclass_instance() or product).build_description()
+
+            updated += Product.objects.bulk_update(products, ["description"])
+            last_id = products[-1].id
+
+
 class Product(models.Model):
     """Model that defines all products.
     """
@@ -54,7 +215,14 @@ class Product(models.Model):
 
     PRODUCT_CHOICES = ((product_type, product_type) for product_type in PRODUCT_TYPES)
 
+    # Position of each product type in the catalog, caps are listed before t-shirts.
+    TYPE_RANKS = {product_type: rank for rank, product_type in enumerate(PRODUCT_TYPES, start=1)}
+
+    # Fields the description is built from.
+    DESCRIPTION_FIELDS = {"product_type", "main_color", "secondary_colors", "brand", "inclusion_date"}
+
     product_type = models.CharField(max_length=20, editable=False, choices=PRODUCT_CHOICES)
+    type_rank = models.PositiveSmallIntegerField(editable=False, default=0)
     main_color = models.CharField(max_length=20)
     secondary_colors = models.CharField(max_length=200)
     brand = models.CharField(max_length=50)
@@ -65,9 +233,45 @@ class Product(models.Model):
     current_stock = models.PositiveIntegerField()
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    description = models.TextField(editable=False, default="")
+    # Changed by every write to the product, its subclass row and its stock, it's the validator of conditional GETs.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_deleted", "type_rank", "-inclusion_date", "id"], name="product_catalog_idx"),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        self.type_rank = self.TYPE_RANKS.get(self.product_type, 0)
+        self.description = self.build_description()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "updated_at"}
+            if self.DESCRIPTION_FIELDS.intersection(update_fields):
+                kwargs["update_fields"].add("description")
+
+        super().save(*args, **kwargs)
+
+    def get_subclass_instance(self) -> "Cap | Tshirt | None":
+        """Return the Cap or Tshirt instance of this product, or None if it has no subclass row.
+
+        Only the relation matching the product type is accessed, so a product loaded with
+        `ProductQuerySet.with_subclasses` never triggers an extra query.
+        """
+
+        if isinstance(self, (Cap, Tshirt)):
+            return self
+
+        return getattr(self, self.product_type.lower(), None)
+
+    def build_description(self) -> str:
+        """Render the description stored in the `description` column.
+        """
 
-    @property
-    def description(self) -> str:
         description = f"{self.main_color} {self.brand} {self.get_product_type_display()} with secondary colors "\
                       f"{self.secondary_colors}, included in the catalog in the year {self.inclusion_date.year}"
         return description
@@ -98,6 +302,8 @@ class Tshirt(Product):
         "silk"
     ]
 
+    DESCRIPTION_FIELDS = Product.DESCRIPTION_FIELDS | {"size", "composition"}
+
     size = models.CharField(max_length=20)
     composition = models.JSONField(
         validators=[
@@ -108,9 +314,8 @@ class Tshirt(Product):
     gender = models.CharField(max_length=20, choices=GENDER_CHOICES)
     has_sleeves = models.BooleanField()
 
-    @property
-    def description(self):
-        description = f"{super().description}, size {self.size}, composition {self.composition_display}"
+    def build_description(self) -> str:
+        description = f"{super().build_description()}, size {self.size}, composition {self.composition_display}"
         return description
 
     @property
@@ -121,9 +326,180 @@ class Tshirt(Product):
 class ShoppingCart(models.Model):
     purchased = models.BooleanField(default=False)
     created_on = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Every cart and order request looks up the current shopping cart, the one not purchased yet.
+            models.Index(fields=["created_on"], condition=models.Q(purchased=False), name="shopping_cart_open_idx"),
+        ]
+
+
+class CartItemQuerySet(models.QuerySet):
+    """QuerySet that defines the cart item specific writes.
+    """
+
+    def add_quantities(self, shopping_cart_id: int, quantities: dict[int, int]) -> list["CartItem"]:
+        """Add the given quantities to the lines of a shopping cart with a single upsert.
+
+        The lines that don't exist are inserted and the others are incremented by the database in the same
+        statement, relying on the unique (shopping_cart, product) constraint, so concurrent requests can't
+        create duplicate lines. The quantity of a line never goes below zero.
+
+        Args:
+            shopping_cart_id (int): The id of the shopping cart.
+            quantities (dict[int, int]): The quantity to add mapped by product id, negative to remove products.
+
+        Returns:
+            list[CartItem]: The lines written, with their resulting quantity.
+        """
+
+        if not quantities:
+            return []
+
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        columns = {
+            name: quote_name(self.model._meta.get_field(name).column)
+            for name in ("id", "shopping_cart", "product", "quantity", "updated_at")
+        }
+        updated_at = self.model._meta.get_field("updated_at").get_db_prep_save(timezone.now(), connection)
+
+        values, params = [], []
+        for product_id, quantity in quantities.items():
+            values.append("(%s, %s, %s, %s)")
+            params += [shopping_cart_id, product_id, max(0, quantity), updated_at]
+
+        # The quantity to add to each existing line, the proposed row only holds it clamped to zero.
+        added_quantity = "CASE excluded.{product} {whens} END".format(
+            product=columns["product"], whens=" ".join(["WHEN %s THEN %s"] * len(quantities))
+        )
+        added_params = [param for product_id, quantity in quantities.items() for param in (product_id, quantity)]
+        new_quantity = f"{table}.{columns['quantity']} + {added_quantity}"
+
+        sql = (
+            f"INSERT INTO {table} ({columns['shopping_cart']}, {columns['product']}, {columns['quantity']}, "
+            f"{columns['updated_at']}) VALUES {', '.join(values)} "
+            f"ON CONFLICT ({columns['shopping_cart']}, {columns['product']}) DO UPDATE SET "
+            f"{columns['quantity']} = CASE WHEN {new_quantity} > 0 THEN {new_quantity} ELSE 0 END, "
+            f"{columns['updated_at']} = excluded.{columns['updated_at']} "
+            f"RETURNING {columns['id']}, {columns['product']}, {columns['quantity']}"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + added_params * 2)
+            rows = cursor.fetchall()
+
+        return [
+            self.model.from_db(
+                self.db, ["id", "shopping_cart_id", "product_id", "quantity"],
+                (cart_item_id, shopping_cart_id, product_id, quantity)
+            )
+            for cart_item_id, product_id, quantity in rows
+        ]
 
 
 class CartItem(models.Model):
-    shopping_cart = models.ForeignKey(ShoppingCart, on_delete=models.CASCADE)
+    shopping_cart = models.ForeignKey(ShoppingCart, on_delete=models.CASCADE, db_index=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Also indexes the lines of a shopping cart, it starts with shopping_cart.
+            models.UniqueConstraint(fields=["shopping_cart", "product"], name="cart_item_cart_product_uniq"),
+        ]
+        indexes = [
+            # Covers the lookup of the products with changes of the stock reconciliation.
+            models.Index(fields=["updated_at", "product"], name="cart_item_updated_idx"),
+        ]
+
+
+class StockMovement(models.Model):
+    """Model that records every change to the stock of a product, rows are only ever appended.
+
+    The stock of a product is its latest snapshot (or its initial stock) plus the movements after it.
+    """
+
+    ADD_TO_CART = "AddToCart"
+    ADJUSTMENT = "Adjustment"
+    RECONCILIATION = "Reconciliation"
+
+    REASON_TYPES = [ADD_TO_CART, ADJUSTMENT, RECONCILIATION]
+
+    REASON_CHOICES = ((reason, reason) for reason in REASON_TYPES)
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "id"], name="stock_movement_product_idx"),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """Model that stores the stock of a product after a given movement.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False)
+    stock = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "-last_movement_id"], name="stock_snapshot_product_idx"),
+        ]
+
+
+class JobWatermark(models.Model):
+    """Model that stores up to when a periodic job has processed the data.
+    """
+
+    job = models.CharField(max_length=100, unique=True)
+    processed_until = models.DateTimeField()
+
+
+class AppliedFixture(models.Model):
+    """Model that stores the fingerprint of the last version of a fixture loaded into the database.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(auto_now=True)
+
+
+class OutboxEmail(models.Model):
+    """Model that stores an email to be sent by the outbox worker once the transaction that wrote it commits.
+    """
+
+    PENDING = "Pending"
+    SENT = "Sent"
+    FAILED = "Failed"
+
+    STATUS_TYPES = [PENDING, SENT, FAILED]
+
+    STATUS_CHOICES = ((email_status, email_status) for email_status in STATUS_TYPES)
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_email_pending_idx"),
+        ]
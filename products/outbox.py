@@ -0,0 +1,117 @@
+"""Module to send emails through a transactional outbox.
+
+Emails are stored in the same transaction as the change they notify about, so they are only sent if it
+commits, and a worker sends them afterwards. This keeps the mail server out of the request.
+"""
+
+from datetime import datetime, timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from products.models import OutboxEmail
+from products.transactions import write_atomic
+
+# Number of attempts after which an email is marked as failed.
+MAX_ATTEMPTS = 5
+# Delay before the first retry of an email, in seconds. It's doubled on every attempt.
+RETRY_BASE_DELAY = 30
+# How long the emails claimed by a worker are hidden from the others, it must be longer than sending a batch.
+SEND_LEASE = timedelta(minutes=10)
+
+
+def queue_email(subject: str, message: str, from_email: str, recipient_list: list[str]) -> OutboxEmail:
+    """Store an email in the outbox, it takes the same arguments as `send_mail`.
+    """
+
+    return OutboxEmail.objects.create(
+        subject=subject, body=message, from_email=from_email, recipients=recipient_list
+    )
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+
+def claim_pending_emails(now: datetime, batch_size: int) -> list[OutboxEmail]:
+    """Return a batch of the pending emails that are due, leased to this worker for SEND_LEASE.
+
+    The lease moves their next attempt forward in a short transaction, so other workers skip them while they are
+    sent, and they are retried once it expires if this worker dies before recording the results.
+    """
+
+    with write_atomic():
+        # Workers running at the same time skip the emails locked by each other instead of sending them twice.
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.PENDING, next_attempt_at__lte=now
+            ).order_by("next_attempt_at", "id")[:batch_size]
+        )
+        OutboxEmail.objects.filter(id__in=[email.id for email in emails]).update(next_attempt_at=now + SEND_LEASE)
+
+    return emails
+
+
+def send_pending_emails(batch_size: int = 100, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Send a batch of the pending emails that are due, reusing a single connection to the mail server.
+
+    Emails that can't be sent are retried later with an exponential backoff, up to `max_attempts` times. No
+    transaction is open while the mail server is contacted, so the worker never blocks the writes of the requests.
+
+    Args:
+        batch_size (int): Maximum number of emails sent.
+        max_attempts (int): Number of attempts after which an email is marked as failed.
+
+    Returns:
+        int: The number of emails sent.
+    """
+
+    now = timezone.now()
+    sent = 0
+
+    emails = claim_pending_emails(now, batch_size)
+    if not emails:
+        return 0
+
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            mark_attempt_failed(email, error, now, max_attempts)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.recipients, connection=connection
+                )
+
+                # Sent one at a time over the open connection, so a failure only retries that email.
+                try:
+                    connection.send_messages([message])
+                except Exception as error:
+                    mark_attempt_failed(email, error, now, max_attempts)
+                else:
+                    email.attempts += 1
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = now
+                    sent += 1
+        finally:
+            connection.close()
+
+    with write_atomic():
+        OutboxEmail.objects.bulk_update(
+            emails, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+        )
+
+    return sent
+
+
+def mark_attempt_failed(email: OutboxEmail, error: Exception, now: datetime, max_attempts: int) -> None:
+    email.attempts += 1
+    email.last_error = repr(error)
+
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = now + get_retry_delay(email.attempts)
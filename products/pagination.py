@@ -0,0 +1,206 @@
+"""Create your paginators here.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """Paginate a queryset with opaque cursors that point to the last row of the previous page.
+
+    Unlike OFFSET pagination, every page is fetched by seeking to the cursor position with a WHERE clause over
+    the `ordering` fields, so the cost of a page doesn't depend on how deep it is. The last field of `ordering`
+    must be unique to break ties between rows.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering: tuple[str, ...] = ("id", )
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list[Model]:
+        queryset = self.get_page_queryset(queryset, request)
+
+        try:
+            results = list(queryset)
+        except (ValueError, ValidationError):
+            # The cursor decoded fine but holds values that don't fit the ordering fields.
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.set_page(results)
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request) -> list[Model]:
+        queryset = self.get_page_queryset(queryset, request)
+
+        try:
+            results = [instance async for instance in queryset]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.set_page(results)
+
+    def get_page_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """Return the queryset of the requested page plus one row, to know if there are more after it.
+        """
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.reverse, self.position = self.decode_cursor(request)
+
+        ordering = self.get_ordering(self.reverse)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.get_seek_filter(ordering, self.position))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results: list[Model]) -> list[Model]:
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+
+        return self.page
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view) -> list[dict]:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request: Request) -> int:
+        """Return the page size asked for by the client, up to `max_page_size`, or the default one if it isn't valid.
+        """
+
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse: bool) -> list[str]:
+        """Return the `ordering` fields, inverting each direction when paginating backwards.
+        """
+
+        if not reverse:
+            return list(self.ordering)
+
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering]
+
+    @staticmethod
+    def get_seek_filter(ordering: list[str], position: list) -> Q:
+        """Build the filter that selects the rows that come after `position` in the given ordering.
+
+        For an ordering (a, -b, c) it expands to `a >= A AND (a > A OR (b <= B AND (b < B OR c > C)))`, which
+        gives the database a range condition on the leading field to seek into an index with.
+        """
+
+        seek_filter = None
+
+        for field, value in reversed(list(zip(ordering, position))):
+            descending = field.startswith("-")
+            field = field.lstrip("-")
+            strict_lookup, lookup = ("lt", "lte") if descending else ("gt", "gte")
+
+            strict_filter = Q(**{f"{field}__{strict_lookup}": value})
+            if seek_filter is None:
+                seek_filter = strict_filter
+            else:
+                seek_filter = Q(**{f"{field}__{lookup}": value}) & (strict_filter | seek_filter)
+
+        return seek_filter
+
+    def get_position(self, instance: Model) -> list:
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            position.append(value.isoformat() if hasattr(value, "isoformat") else value)
+
+        return position
+
+    def get_next_link(self) -> str | None:
+        # Going backwards there is always a next page: the one the previous cursor was built from.
+        if not self.page or (not self.reverse and not self.has_more):
+            return None
+
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self) -> str | None:
+        if not self.page or (self.reverse and not self.has_more) or (not self.reverse and self.position is None):
+            return None
+
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+    def decode_cursor(self, request: Request) -> tuple[bool, list | None]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse, position = bool(cursor["r"]), cursor["p"]
+        except (BinasciiError, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, reverse: bool, position: list) -> str:
+        cursor = json.dumps({"r": int(reverse), "p": position}, separators=(",", ":"))
+        encoded = urlsafe_b64encode(cursor.encode("ascii")).decode("ascii")
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+
+class ProductCursorPagination(KeysetCursorPagination):
+    """Paginate the catalog caps first, then t-shirts, newest first.
+    """
+
+    ordering = ("type_rank", "-inclusion_date", "id")
@@ -0,0 +1,216 @@
+"""Module to profile individual requests.
+
+A request is profiled when it has the `X-Profile` header with the PROFILING_TOKEN, when it's picked by the
+PROFILING_SAMPLE_RATE, or once it has been running for PROFILING_LATENCY_THRESHOLD milliseconds. A background
+thread samples the stack of the threads of the profiled requests, so requests that aren't profiled don't run
+any profiling code. Each profile is written to PROFILING_DIR as collapsed stacks (`.folded`, the input of
+flamegraph.pl, speedscope or inferno) and as a call tree (`.txt`), keeping the latest PROFILING_MAX_PROFILES.
+"""
+
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Callable
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+
+
+def get_stack(frame: FrameType) -> tuple[str, ...]:
+    """Return the functions of the stack of a frame, from the outermost.
+
+    Each function is named by its module, name and first line, which tells apart the methods of the same name
+    of different classes of a module.
+    """
+
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_name}:{code.co_firstlineno}")
+        frame = frame.f_back
+
+    return tuple(reversed(stack))
+
+
+class SamplingProfiler:
+    """Sample the stacks of the registered threads every `interval` seconds from a background thread.
+
+    The thread only wakes up while some thread is being profiled, or when a watched one reaches its deadline.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.profiled: dict[int, Counter] = {}
+        self.watched: dict[int, tuple[float, Counter]] = {}
+        self.thread: threading.Thread | None = None
+
+    def profile(self, thread_id: int) -> Counter:
+        """Start sampling a thread, the returned counter gets the number of samples of each stack.
+        """
+
+        return self.watch(thread_id, time.monotonic())
+
+    def watch(self, thread_id: int, deadline: float) -> Counter:
+        """Start sampling a thread at the given `time.monotonic` deadline, if it's still registered by then.
+        """
+
+        stacks = Counter()
+        with self.lock:
+            self.watched[thread_id] = (deadline, stacks)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+                self.thread.start()
+
+        self.wakeup.set()
+        return stacks
+
+    def stop(self, thread_id: int) -> None:
+        with self.lock:
+            self.watched.pop(thread_id, None)
+            self.profiled.pop(thread_id, None)
+
+    def run(self) -> None:
+        try:
+            while True:
+                # Cleared before looking at the threads, so a thread registered meanwhile wakes up the wait.
+                self.wakeup.clear()
+
+                try:
+                    timeout = self.sample()
+                except Exception:
+                    logger.exception("Sampling the profiled threads failed")
+                    timeout = self.interval
+
+                self.wakeup.wait(timeout)
+        finally:
+            # The next registered thread starts a new sampling thread.
+            with self.lock:
+                self.thread = None
+
+    def sample(self) -> float | None:
+        """Sample the stacks of the profiled threads and return the seconds to wait for the next sample.
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            for thread_id, (deadline, stacks) in list(self.watched.items()):
+                if deadline <= now:
+                    del self.watched[thread_id]
+                    self.profiled[thread_id] = stacks
+
+            if self.profiled:
+                frames = sys._current_frames()
+                for thread_id, stacks in self.profiled.items():
+                    if thread_id in frames:
+                        stacks[get_stack(frames[thread_id])] += 1
+
+                return self.interval
+            elif self.watched:
+                return min(deadline for deadline, _ in self.watched.values()) - now
+            else:
+                return None
+
+
+def format_folded(stacks: Counter) -> str:
+    return "".join(f"{';'.join(stack)} {samples}\n" for stack, samples in stacks.items())
+
+
+def format_call_tree(stacks: Counter, min_percent: float = 0.5) -> str:
+    """Return the call tree of the stacks, with the percentage and number of samples spent in each call.
+
+    Calls with less than `min_percent` of the samples are left out.
+    """
+
+    tree: dict = {}
+    for stack, samples in stacks.items():
+        children = tree
+        for function in stack:
+            node = children.setdefault(function, {"samples": 0, "children": {}})
+            node["samples"] += samples
+            children = node["children"]
+
+    total = sum(stacks.values())
+    lines = [f"{total} samples"]
+
+    def add_lines(children: dict, depth: int):
+        for function, node in sorted(children.items(), key=lambda item: -item[1]["samples"]):
+            percent = node["samples"] / total * 100
+            if percent >= min_percent:
+                lines.append(f"{'  ' * depth}{percent:5.1f}% {node['samples']:>6}  {function}")
+                add_lines(node["children"], depth + 1)
+
+    add_lines(tree, 0)
+    return "\n".join(lines) + "\n"
+
+
+def write_profile(directory: Path, name: str, stacks: Counter, max_profiles: int) -> None:
+    """Write the profile files and delete the oldest profiles beyond `max_profiles`.
+    """
+
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{name}.folded").write_text(format_folded(stacks))
+    (directory / f"{name}.txt").write_text(format_call_tree(stacks))
+
+    # The names start with the time, so they sort from the oldest.
+    for folded_path in sorted(directory.glob("*.folded"))[:-max_profiles]:
+        folded_path.unlink(missing_ok=True)
+        folded_path.with_suffix(".txt").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profile the requests selected by the header, the sampling rate or the latency threshold.
+
+    It's disabled if PROFILING_DIR is empty or no trigger is configured. The name of the profile of a request is
+    sent in its `X-Profile` response header. It's sync only, the sampled thread is the one handling the request,
+    which an async request doesn't keep.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.token = settings.PROFILING_TOKEN
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.latency_threshold = settings.PROFILING_LATENCY_THRESHOLD / 1000
+
+        if not settings.PROFILING_DIR or not (self.token or self.sample_rate or self.latency_threshold):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.directory = Path(settings.PROFILING_DIR)
+        self.profiler = SamplingProfiler(settings.PROFILING_INTERVAL)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        thread_id = threading.get_ident()
+        token = request.headers.get(PROFILE_HEADER)
+
+        if (self.token and token and constant_time_compare(token, self.token)) or random.random() < self.sample_rate:
+            stacks = self.profiler.profile(thread_id)
+        elif self.latency_threshold:
+            stacks = self.profiler.watch(thread_id, time.monotonic() + self.latency_threshold)
+        else:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            self.profiler.stop(thread_id)
+
+        if stacks:
+            view_name = request.resolver_match.view_name if request.resolver_match else "unknown"
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{view_name.replace(':', '-')}"
+            write_profile(self.directory, name, stacks, settings.PROFILING_MAX_PROFILES)
+            response[PROFILE_HEADER] = name
+
+        return response
@@ -0,0 +1,138 @@
+"""Module to route the catalog and cart reads to the database replicas.
+
+Reads only go to a replica inside `replica_reads`, which the GET views in `ReplicaReadMixin` enter, so writes,
+cron jobs and commands always use the primary. After a client writes, it's sent a cookie that makes its reads
+use the primary for `REPLICA_STICKY_SECONDS`, so it sees its own writes even if the replicas lag behind. The
+catalog cache entries are built inside `primary_reads`, a lagging replica can't store stale data under the new
+catalog version.
+"""
+
+import random
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest, HttpResponse
+from rest_framework.response import Response
+
+REPLICA_STICKY_COOKIE = "primary_reads"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """Send the reads made inside the block to a replica, if there is any.
+    """
+
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Send the reads made inside the block to the primary, even inside `replica_reads`.
+    """
+
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def get_replica_aliases() -> list[str]:
+    return getattr(settings, "DATABASE_REPLICA_ALIASES", [])
+
+
+class ReplicaRouter:
+    """Database router that sends the reads made inside `replica_reads` to a random replica.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        replica_aliases = get_replica_aliases()
+
+        # Reads inside a transaction of the primary must see its writes.
+        if not _replica_reads.get() or not replica_aliases or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(replica_aliases)
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # The replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: str | None = None, **hints) -> bool:
+        # The replicas get the schema from the primary.
+        return db not in get_replica_aliases()
+
+
+class ReplicaReadMixin:
+    """Make the queries of the GET requests of a view read from a replica, unless the client wrote recently.
+    """
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> Response:
+        if request.method not in ("GET", "HEAD") or REPLICA_STICKY_COOKIE in request.COOKIES:
+            return super().dispatch(request, *args, **kwargs)
+
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """Send the cookie that makes the reads of a client use the primary after it makes a write request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if request.method not in SAFE_METHODS and response.status_code < 400 and get_replica_aliases():
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax"
+            )
+
+        return response
+
+
+def refresh_replica(path: str) -> None:
+    """Copy the primary SQLite database into the file of a replica.
+
+    It's how a second SQLite file stands in for a replica locally, production replicas are kept up to date by
+    the database itself.
+    """
+
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+
+    replica = sqlite3.connect(path)
+    try:
+        primary.connection.backup(replica)
+    finally:
+        replica.close()
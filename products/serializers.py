@@ -6,16 +6,63 @@ from datetime import datetime
 from django.db import transaction
 from rest_framework import serializers
 
-from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem
+from products.cache import bump_catalog_version
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, StockMovement, get_subclass_fields
+from products.timing import timed
+from products.transactions import write_atomic
 
 
-class CapSerializer(serializers.ModelSerializer):
+class StockUnavailable(Exception):
+    """Raised to roll back a transaction when a product doesn't have enough stock.
+    """
+
+
+class SparseFieldsSerializerMixin:
+    """Build only the fields in the "fields" of the serializer context, when there are.
+    """
+
+    def get_fields(self) -> dict:
+        fields = super().get_fields()
+
+        requested_fields = self.context.get("fields")
+        if requested_fields is None:
+            return fields
+
+        return {name: field for name, field in fields.items() if name in requested_fields}
+
+
+def get_subclass_data(instance: Product, context: dict) -> dict:
+    """Return the representation of the Cap or Tshirt fields of a product.
+
+    The subclass instance isn't accessed if none of its fields is requested in the context, so a product
+    loaded with `ProductQuerySet.with_fields` doesn't hit the database.
+    """
+
+    requested_fields = context.get("fields")
+    if requested_fields is not None:
+        # Checked for every product type first, the product type isn't fetched if no subclass field is requested.
+        if not any(requested_fields & get_subclass_fields(product_type) for product_type in Product.PRODUCT_TYPES):
+            return {}
+        if not requested_fields & get_subclass_fields(instance.product_type):
+            return {}
+
+    subclass_instance = instance.get_subclass_instance()
+
+    if isinstance(subclass_instance, Cap):
+        return CapSerializer(subclass_instance, context=context).to_representation(subclass_instance)
+    elif isinstance(subclass_instance, Tshirt):
+        return TshirtSerializer(subclass_instance, context=context).to_representation(subclass_instance)
+
+    return {}
+
+
+class CapSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Cap
         fields = ["logo_color"]
 
 
-class TshirtSerializer(serializers.ModelSerializer):
+class TshirtSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     gender = serializers.CharField()
     description = serializers.CharField(read_only=True)
 
@@ -32,7 +79,7 @@ class TshirtSerializer(serializers.ModelSerializer):
         return capitalized_value
 
 
-class ProductListCreateSerializer(serializers.ModelSerializer):
+class ProductListCreateSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     product_type = serializers.CharField()
     current_stock = serializers.IntegerField(read_only=True)
     description = serializers.CharField(read_only=True)
@@ -40,7 +87,7 @@ class ProductListCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        exclude = ("is_deleted", "deleted_at")
+        exclude = ("type_rank", "is_deleted", "deleted_at", "updated_at")
 
     def validate_product_type(self, value: str) -> str:
         capitalized_value = value.capitalize()
@@ -59,12 +106,8 @@ class ProductListCreateSerializer(serializers.ModelSerializer):
         return value
 
     def to_representation(self, instance: Product) -> dict:
-        data = super().to_representation(instance)
-
-        if hasattr(instance, "cap"):
-            data |= CapSerializer(instance.cap).to_representation(instance.cap)
-        elif hasattr(instance, "tshirt"):
-            data |= TshirtSerializer(instance.tshirt).to_representation(instance.tshirt)
+        with timed("serialize"):
+            data = super().to_representation(instance) | get_subclass_data(instance, self.context)
 
         return data
 
@@ -83,24 +126,22 @@ class ProductListCreateSerializer(serializers.ModelSerializer):
             validated_data |= tshirt_serializer.validated_data
             product = Tshirt.objects.create(**validated_data)
 
+        bump_catalog_version()
+
         return product
 
 
-class ProductRetrieveUpdateDestroySerializer(serializers.ModelSerializer):
+class ProductRetrieveUpdateDestroySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     product_type = serializers.CharField(read_only=True)
     description = serializers.CharField(read_only=True)
 
     class Meta:
         model = Product
-        exclude = ("is_deleted", "deleted_at", "initial_stock")
+        exclude = ("type_rank", "is_deleted", "deleted_at", "initial_stock", "updated_at")
 
     def to_representation(self, instance: Product) -> dict:
-        data = super().to_representation(instance)
-
-        if hasattr(instance, "cap"):
-            data |= CapSerializer(instance.cap).to_representation(instance.cap)
-        elif hasattr(instance, "tshirt"):
-            data |= TshirtSerializer(instance.tshirt).to_representation(instance.tshirt)
+        with timed("serialize"):
+            data = super().to_representation(instance) | get_subclass_data(instance, self.context)
 
         return data
 
@@ -109,14 +150,28 @@ class ProductRetrieveUpdateDestroySerializer(serializers.ModelSerializer):
             cap_serializer = CapSerializer(data=self.initial_data, partial=self.partial)
             cap_serializer.is_valid(raise_exception=True)
             validated_data |= cap_serializer.validated_data
-            instance = instance.cap
+            instance = instance.get_subclass_instance()
         elif instance.product_type == Product.TSHIRT:
             tshirt_serializer = TshirtSerializer(data=self.initial_data, partial=self.partial)
             tshirt_serializer.is_valid(raise_exception=True)
             validated_data |= tshirt_serializer.validated_data
-            instance = instance.tshirt
+            instance = instance.get_subclass_instance()
+
+        previous_stock = instance.current_stock
+
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+
+            if instance.current_stock != previous_stock:
+                StockMovement.objects.create(
+                    product=instance,
+                    quantity=instance.current_stock - previous_stock,
+                    reason=StockMovement.ADJUSTMENT
+                )
+
+        bump_catalog_version()
 
-        return super().update(instance, validated_data)
+        return instance
 
 
 class ProductInCartSerializer(serializers.ModelSerializer):
@@ -127,6 +182,76 @@ class ProductInCartSerializer(serializers.ModelSerializer):
         fields = ["product_id", "description", "photo_url", "unit_price"]
 
 
+class CartItemListSerializer(serializers.ListSerializer):
+    """Add several products to the shopping cart at once.
+    """
+
+    def to_internal_value(self, data: list) -> list[dict]:
+        # Lists of an invalid length are rejected by `super().to_internal_value` without loading the products.
+        if isinstance(data, list) and (data or self.allow_empty) and (
+            self.max_length is None or len(data) <= self.max_length
+        ):
+            product_ids = set()
+            for item in data:
+                try:
+                    product_ids.add(int(item["product_id"]))
+                except (TypeError, KeyError, ValueError):
+                    continue
+
+            # Load every product with one query, the items validate against it.
+            self.context["products_by_id"] = Product.objects.in_bulk(product_ids)
+
+        return super().to_internal_value(data)
+
+    def create(self, validated_data: list[dict]) -> list[CartItem]:
+        quantities: dict[int, int] = {}
+        for item in validated_data:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+
+        today = datetime.utcnow().date()
+
+        try:
+            with write_atomic():
+                shopping_cart, _ = ShoppingCart.objects.select_for_update().get_or_create(
+                    created_on=today, purchased=False
+                )
+                cart_items = CartItem.objects.add_quantities(shopping_cart.id, quantities)
+
+                if not Product.objects.decrement_stocks(quantities):
+                    raise StockUnavailable
+
+                StockMovement.objects.bulk_create([
+                    StockMovement(product_id=product_id, quantity=-quantity, reason=StockMovement.ADD_TO_CART)
+                    for product_id, quantity in quantities.items()
+                ])
+                bump_catalog_version()
+        except StockUnavailable:
+            # Some stock ran out since the validation, the transaction was rolled back.
+            raise serializers.ValidationError(self.get_stock_errors(validated_data, quantities))
+
+        return cart_items
+
+    @staticmethod
+    def get_stock_errors(validated_data: list[dict], quantities: dict[int, int]) -> list[dict]:
+        stocks = dict(Product.objects.available().filter(id__in=quantities).values_list("id", "current_stock"))
+
+        errors = []
+        for item in validated_data:
+            product_id = item["product_id"]
+            if product_id not in stocks:
+                errors.append({"product_id": [f"Product with id {product_id} does not exist."]})
+            elif quantities[product_id] > stocks[product_id]:
+                errors.append({"quantity": ["Not enough stock available."]})
+            else:
+                errors.append({})
+
+        if not any(errors):
+            # The stock was given back in the meantime, there is no way to tell which product failed.
+            errors = [{"quantity": ["Not enough stock available."]} for _ in validated_data]
+
+        return errors
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(default=1)
@@ -134,11 +259,22 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ("product_id", "quantity")
+        list_serializer_class = CartItemListSerializer
+
+    def get_product(self, product_id: int) -> Product:
+        products_by_id = self.context.get("products_by_id")
+        if products_by_id is None:
+            return Product.objects.get(id=product_id)
+
+        try:
+            return products_by_id[product_id]
+        except KeyError:
+            raise Product.DoesNotExist
 
     def validate(self, attrs):
         product_id = attrs["product_id"]
         try:
-            product = Product.objects.get(id=product_id)
+            product = self.get_product(product_id)
         except Product.DoesNotExist:
             raise serializers.ValidationError({"product_id": f"Product with id {product_id} does not exist."})
 
@@ -154,31 +290,31 @@ class CartItemSerializer(serializers.ModelSerializer):
         return attrs
 
     def to_representation(self, instance: CartItem) -> dict:
-        data = ProductInCartSerializer(instance.product).data
-        data["quantity"] = instance.quantity
+        with timed("serialize"):
+            data = ProductInCartSerializer(instance.product).data
+            data["quantity"] = instance.quantity
 
         return data
 
     def create(self, validated_data: dict) -> Cap | Tshirt:
+        product_id: int = validated_data["product_id"]
         quantity: int = validated_data["quantity"]
         today = datetime.utcnow().date()
 
-        with transaction.atomic():
-            product: Product = Product.objects.select_for_update().get(
-                id=validated_data["product_id"], is_deleted=False
-            )
+        with write_atomic():
             shopping_cart, _ = ShoppingCart.objects.select_for_update().get_or_create(
                 created_on=today, purchased=False
             )
-            cart_item, _ = CartItem.objects.select_for_update().get_or_create(
-                shopping_cart=shopping_cart, product=product
-            )
+            cart_item, = CartItem.objects.add_quantities(shopping_cart.id, {product_id: quantity})
 
-            cart_item.quantity = max(0, cart_item.quantity + quantity)
-            product.current_stock -= quantity
+            # Decrement the stock last, so the product row is locked as briefly as possible.
+            if not Product.objects.decrement_stock(product_id, quantity):
+                if not Product.objects.available().filter(id=product_id).exists():
+                    raise serializers.ValidationError({"product_id": f"Product with id {product_id} does not exist."})
+                raise serializers.ValidationError({"quantity": "Not enough stock available."})
 
-            cart_item.save(update_fields=["quantity"])
-            product.save(update_fields=["current_stock"])
+            StockMovement.objects.create(product_id=product_id, quantity=-quantity, reason=StockMovement.ADD_TO_CART)
+            bump_catalog_version()
 
             return cart_item
 
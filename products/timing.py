@@ -0,0 +1,212 @@
+"""Module to measure where the time of each request goes.
+
+`ServerTimingMiddleware` counts the SQL queries of the request and adds up the time spent in the database,
+serializing and rendering. It sends them in the `Server-Timing` header, logs them and checks the query budget
+of the view. Queries are recorded with a database execute wrapper, so no query is kept in memory.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Values of the QUERY_BUDGET_ACTION setting.
+LOG = "log"
+RAISE = "raise"
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request makes more SQL queries than the budget of its view and the action is "raise".
+    """
+
+
+@dataclass
+class RequestMetrics:
+    """Metrics of a request, the durations are in seconds.
+    """
+
+    queries: int = 0
+    db: float = 0.0
+    serialize: float = 0.0
+    render: float = 0.0
+    total: float = 0.0
+    measuring: set[str] = field(default_factory=set)
+
+    def record_query(self, execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def get_server_timing(self) -> str:
+        return ", ".join([
+            f'db;dur={self.db * 1000:.3f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialize * 1000:.3f}",
+            f"render;dur={self.render * 1000:.3f}",
+            f"total;dur={self.total * 1000:.3f}",
+        ])
+
+
+_request_metrics: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def get_request_metrics() -> RequestMetrics | None:
+    """Return the metrics of the request being handled, None outside of a request.
+    """
+
+    return _request_metrics.get()
+
+
+@contextmanager
+def timed(metric: str) -> Iterator[None]:
+    """Add the time spent in the block to a metric of the current request.
+
+    The database time of the block isn't added, it's already in the `db` metric. Nested blocks of the same
+    metric are only measured once, by the outermost one.
+    """
+
+    metrics = _request_metrics.get()
+    if metrics is None or metric in metrics.measuring:
+        yield
+        return
+
+    metrics.measuring.add(metric)
+    start = time.perf_counter()
+    db_start = metrics.db
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (metrics.db - db_start)
+        setattr(metrics, metric, getattr(metrics, metric) + elapsed)
+        metrics.measuring.discard(metric)
+
+
+def record_queries(metrics: RequestMetrics) -> ExitStack:
+    """Record the queries of the connections of the current thread in `metrics` until the returned stack is closed.
+    """
+
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics.record_query))
+
+    return stack
+
+
+def check_query_budget(request: HttpRequest, metrics: RequestMetrics) -> None:
+    """Log, or raise `QueryBudgetExceeded`, if the request made more queries than the budget of its view.
+    """
+
+    if request.resolver_match is None:
+        return
+
+    view_name = request.resolver_match.view_name
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is None or metrics.queries <= budget:
+        return
+
+    message = f"{request.method} {request.path} made {metrics.queries} queries, the budget of {view_name} is {budget}"
+    if settings.QUERY_BUDGET_ACTION == RAISE:
+        raise QueryBudgetExceeded(message)
+
+    logger.warning(message)
+
+
+class ServerTimingMiddleware:
+    """Measure every request, send its metrics in the `Server-Timing` header and log them.
+
+    It runs in the mode of the handler, so it doesn't add a thread switch to the async middleware chain of ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        token = _request_metrics.set(metrics)
+        try:
+            with record_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+
+        return self.process_metrics(request, response, metrics, start)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        token = _request_metrics.set(metrics)
+        try:
+            # The connections are per thread, the queries of the request run in the thread of its sync code.
+            stack = await sync_to_async(record_queries)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _request_metrics.reset(token)
+
+        return self.process_metrics(request, response, metrics, start)
+
+    def process_metrics(
+        self, request: HttpRequest, response: HttpResponse, metrics: RequestMetrics, start: float
+    ) -> HttpResponse:
+        metrics.total = time.perf_counter() - start
+        response["Server-Timing"] = metrics.get_server_timing()
+
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        logger.info(
+            "%s %s %s view=%s queries=%d db_ms=%.1f serialize_ms=%.1f render_ms=%.1f total_ms=%.1f",
+            request.method, request.path, response.status_code, view_name, metrics.queries, metrics.db * 1000,
+            metrics.serialize * 1000, metrics.render * 1000, metrics.total * 1000,
+            extra={
+                "request_metrics": {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "view": view_name,
+                    "queries": metrics.queries,
+                    "db_ms": round(metrics.db * 1000, 1),
+                    "serialize_ms": round(metrics.serialize * 1000, 1),
+                    "render_ms": round(metrics.render * 1000, 1),
+                    "total_ms": round(metrics.total * 1000, 1),
+                }
+            }
+        )
+
+        check_query_budget(request, metrics)
+
+        return response
+
+    def process_template_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        # Called right before the response is rendered, rendering ends with the post render callbacks.
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            start = time.perf_counter()
+            db_start = metrics.db
+
+            def record_render(response: HttpResponse) -> None:
+                metrics.render += time.perf_counter() - start - (metrics.db - db_start)
+
+            response.add_post_render_callback(record_render)
+
+        return response
@@ -0,0 +1,300 @@
+"""Module to record request traces and replay them as load.
+
+Traces are JSON lines with the method, path, content type and body of a request. They are recorded from live
+traffic by `TraceRecorderMiddleware`, or read from a Postman collection, and replayed in process through the
+test client or against a running server.
+"""
+
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count
+from typing import IO, Callable, Iterable, Iterator
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import Request, urlopen
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.test import Client
+from django.urls import Resolver404, resolve
+
+POSTMAN_VARIABLE = "{{%s}}"
+
+# Views whose request bodies hold the personal data of the customers.
+PERSONAL_DATA_VIEWS = {"products:order-view", "products:async-order-view"}
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of the values.
+    """
+
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def read_traces(stream: IO[str]) -> Iterator[dict]:
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_postman_collection(collection: dict, variables: dict[str, str] | None = None) -> list[dict]:
+    """Return a trace for every request of a Postman collection, in order.
+
+    The `{{name}}` variables and the `:name` path variables are replaced by the given values, or else by the
+    ones of the collection and of each request. Form data bodies are encoded as a urlencoded form.
+    """
+
+    variables = {
+        variable["key"]: variable["value"] for variable in collection.get("variable", [])
+    } | (variables or {})
+
+    def replace_variables(value: str) -> str:
+        for name, variable_value in variables.items():
+            value = value.replace(POSTMAN_VARIABLE % name, variable_value)
+        return value
+
+    def iter_requests(items: list[dict]) -> Iterator[dict]:
+        for item in items:
+            if "item" in item:
+                yield from iter_requests(item["item"])
+            else:
+                yield item["request"]
+
+    traces = []
+    for postman_request in iter_requests(collection.get("item", [])):
+        url = postman_request["url"]
+        raw_url = replace_variables(url["raw"] if isinstance(url, dict) else url)
+        for path_variable in url.get("variable", []) if isinstance(url, dict) else []:
+            raw_url = raw_url.replace(
+                f":{path_variable['key']}", variables.get(path_variable["key"], path_variable["value"])
+            )
+
+        path = urlsplit(raw_url)._replace(scheme="", netloc="").geturl()
+        trace = {"method": postman_request["method"], "path": path, "content_type": None, "body": None}
+
+        body = postman_request.get("body", {})
+        if body.get("mode") in ("formdata", "urlencoded"):
+            trace["content_type"] = "application/x-www-form-urlencoded"
+            trace["body"] = urlencode([
+                (field["key"], replace_variables(field["value"]))
+                for field in body[body["mode"]] if field.get("type", "text") == "text" and not field.get("disabled")
+            ])
+        elif body.get("mode") == "raw":
+            language = body.get("options", {}).get("raw", {}).get("language")
+            trace["content_type"] = "application/json" if language == "json" else "text/plain"
+            trace["body"] = replace_variables(body["raw"])
+
+        traces.append(trace)
+
+    return traces
+
+
+def get_route(trace: dict) -> str:
+    """Return the name of the view of the trace, or its path if it doesn't match any.
+    """
+
+    path = urlsplit(trace["path"]).path
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return path
+
+
+class InProcessSender:
+    """Send traces to the app through the test client, one client per thread.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @staticmethod
+    def get_host() -> str:
+        """Return a host the app accepts, localhost is accepted in debug mode if ALLOWED_HOSTS is empty.
+        """
+
+        for host in settings.ALLOWED_HOSTS:
+            if host != "*" and not host.startswith("."):
+                return host
+
+        return "localhost"
+
+    def __call__(self, trace: dict) -> int:
+        if not hasattr(self.local, "client"):
+            self.local.client = Client(HTTP_HOST=self.get_host())
+
+        response = self.local.client.generic(
+            trace["method"], trace["path"], (trace.get("body") or "").encode(),
+            content_type=trace.get("content_type") or "application/octet-stream"
+        )
+        return response.status_code
+
+
+class HttpSender:
+    """Send traces to a running server.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, trace: dict) -> int:
+        body = trace.get("body")
+        http_request = Request(
+            f"{self.base_url}{trace['path']}", data=body.encode() if body is not None else None,
+            method=trace["method"]
+        )
+        if trace.get("content_type"):
+            http_request.add_header("Content-Type", trace["content_type"])
+
+        try:
+            with urlopen(http_request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as http_error:
+            return http_error.code
+
+
+@dataclass
+class RouteReport:
+    """Results of the replayed requests of a route, the latencies are in seconds.
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int | None, int] = field(default_factory=dict)
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput": len(self.latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(self.latencies, 50) * 1000,
+            "p95_ms": percentile(self.latencies, 95) * 1000,
+            "p99_ms": percentile(self.latencies, 99) * 1000,
+            "statuses": self.statuses,
+        }
+
+
+def replay(
+    traces: Iterable[dict], send: Callable[[dict], int], concurrency: int = 1, rate: float | None = None
+) -> tuple[dict[str, RouteReport], float]:
+    """Send the traces from `concurrency` threads and return the report of each route and the elapsed seconds.
+
+    With a `rate`, in requests per second, request `i` is sent `i / rate` seconds after the start and its
+    latency counts from that moment, so a slow server isn't hidden by requests waiting for a free thread.
+    Responses with a 5xx status and requests that fail to be sent are errors.
+    """
+
+    traces = iter(traces)
+    numbers = count()
+    lock = threading.Lock()
+    reports: dict[str, RouteReport] = {}
+    start = time.perf_counter()
+
+    def worker() -> None:
+        while True:
+            with lock:
+                trace = next(traces, None)
+                number = next(numbers)
+            if trace is None:
+                return
+
+            scheduled = start + number / rate if rate else time.perf_counter()
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+
+            try:
+                status_code = send(trace)
+            except Exception:
+                status_code = None
+            latency = time.perf_counter() - scheduled
+
+            with lock:
+                report = reports.setdefault(get_route(trace), RouteReport())
+                report.latencies.append(latency)
+                report.statuses[status_code] = report.statuses.get(status_code, 0) + 1
+                report.errors += status_code is None or status_code >= 500
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+
+    return reports, time.perf_counter() - start
+
+
+def read_recorded_body(request: HttpRequest) -> str | None:
+    """Return the body of a request to record in its trace.
+
+    It's None when the body isn't text, and when it's multipart or larger than DATA_UPLOAD_MAX_MEMORY_SIZE,
+    reading those would load whole uploads in memory or raise `RequestDataTooBig`.
+    """
+
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return None
+
+    max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if (max_size is not None and content_length > max_size) or request.content_type.startswith("multipart/"):
+        return None
+
+    try:
+        return request.body.decode() or None
+    except UnicodeDecodeError:
+        return None
+
+
+class TraceRecorderMiddleware:
+    """Append a trace of every request to the TRACE_RECORD_FILE file, it's disabled if the setting is empty.
+
+    The bodies of the views in `PERSONAL_DATA_VIEWS` aren't recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        if not settings.TRACE_RECORD_FILE:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        self.lock = threading.Lock()
+        self.file = open(settings.TRACE_RECORD_FILE, "a", buffering=1)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # Read before the view, which can consume the body stream.
+        body = read_recorded_body(request)
+        return self.record(request, body, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        body = read_recorded_body(request)
+        return self.record(request, body, await self.get_response(request))
+
+    def record(self, request: HttpRequest, body: str | None, response: HttpResponse) -> HttpResponse:
+        if request.resolver_match and request.resolver_match.view_name in PERSONAL_DATA_VIEWS:
+            body = None
+
+        trace = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            # The whole header, with the parameters of the body such as its charset.
+            "content_type": request.META.get("CONTENT_TYPE") if body else None,
+            "body": body,
+            "status": response.status_code,
+        }
+        with self.lock:
+            self.file.write(json.dumps(trace) + "\n")
+
+        return response
@@ -0,0 +1,32 @@
+"""Module to run the write paths in short transactions.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def write_atomic(using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """Atomic block that takes the write lock of the database as soon as it starts.
+
+    With the SQLite backend of the performance profile the outermost block starts with `BEGIN IMMEDIATE`, so
+    concurrent writers queue on the busy timeout instead of failing to upgrade their read lock. With any other
+    backend it's the same as `transaction.atomic`.
+    """
+
+    connection = connections[using]
+    immediate = not connection.in_atomic_block
+
+    if immediate:
+        connection.transaction_mode = "IMMEDIATE"
+
+    try:
+        with transaction.atomic(using=using):
+            if immediate:
+                connection.transaction_mode = None
+            yield
+    finally:
+        if immediate:
+            connection.transaction_mode = None
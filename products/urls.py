@@ -2,10 +2,12 @@
 """
 
 from django.urls import re_path
-from products import views
+from products import async_views, views
 
 urlpatterns = [
     re_path(r"^products/$", views.ProductListCreate.as_view(), name="product-list-create"),
+    re_path(r"^products/export/$", views.ProductExport.as_view(), name="product-export"),
+    re_path(r"^products/import/$", views.ProductImport.as_view(), name="product-import"),
     re_path(
         r"^products/(?P<pk>[0-9]+)/$", views.ProductRetrieveUpdateDestroy.as_view(),
         name="product-retrieve-update-destroy"
@@ -14,12 +16,23 @@ urlpatterns = [
         r"^add_product/$", views.CartItemCreate.as_view(),
         name="add-product-view"
     ),
+    re_path(
+        r"^add_products/$", views.CartItemBatchCreate.as_view(),
+        name="add-products-view"
+    ),
     re_path(
         r"^view_cart/$", views.ShoppingCartView.as_view(),
-        name="add-product-view"
+        name="view-cart-view"
     ),
     re_path(
         r"^order/$", views.OrderView.as_view(),
         name="order-view"
     ),
+    re_path(r"^async/products/$", async_views.ProductList.as_view(), name="async-product-list"),
+    re_path(
+        r"^async/products/(?P<pk>[0-9]+)/$", async_views.ProductRetrieve.as_view(),
+        name="async-product-retrieve"
+    ),
+    re_path(r"^async/view_cart/$", async_views.ShoppingCartView.as_view(), name="async-view-cart"),
+    re_path(r"^async/order/$", async_views.OrderView.as_view(), name="async-order-view"),
 ]
@@ -1,48 +1,140 @@
 """Create your views here.
 """
 
-from datetime import datetime
+from datetime import date, datetime
+from io import TextIOWrapper
 
-from django.db import transaction
-from django.db.models import Case, When, Value, CharField
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 
 from rest_framework import status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.generics import (
     ListCreateAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView, GenericAPIView
 )
 
+from products.cache import CatalogCacheMixin, bump_catalog_version
+from products.conditional import ConditionalGetMixin, Validators, get_catalog_validators, get_product_validators
+from products.exporter import CatalogExporter
+from products.fieldsets import SparseFieldsViewMixin
+from products.formats import CSV, FORMATS, NDJSON
+from products.importer import ProductImporter
 from products.models import Product, ShoppingCart, CartItem
+from products.outbox import queue_email
+from products.pagination import ProductCursorPagination
+from products.replicas import ReplicaReadMixin
 from products.serializers import (
     ProductListCreateSerializer, ProductRetrieveUpdateDestroySerializer, CartItemSerializer, OrderSerializer
 )
+from products.transactions import write_atomic
 
-from utils import send_order_email
+from utils import get_order_email
 
 
-class ProductListCreate(ListCreateAPIView):
-    queryset = Product.objects.all().filter(
-        is_deleted=False
-    ).order_by(
-        Case(
-            When(product_type=Product.CAP, then=Value(1)),
-            When(product_type=Product.TSHIRT, then=Value(2)),
-            output_field=CharField()
-        ),
-        "-inclusion_date"
-    )
+def get_shopping_cart_data(today: date) -> dict:
+    """Return the products in the shopping cart of the given day and their total quantity.
+    """
+
+    data = {}
+    try:
+        shopping_cart = ShoppingCart.objects.annotate(
+            total_products=Coalesce(Sum("cartitem__quantity"), 0)
+        ).get(created_on=today, purchased=False)
+    except ShoppingCart.DoesNotExist:
+        data["products"] = []
+        data["total_products"] = 0
+    else:
+        cart_items = CartItem.objects.filter(shopping_cart=shopping_cart).select_related("product").order_by("id")
+        data["products"] = CartItemSerializer(cart_items, many=True).data
+        data["total_products"] = shopping_cart.total_products
+
+    return data
+
+
+@write_atomic()
+def place_order(today: date, order_form: dict) -> None:
+    """Mark the shopping cart of the given day as purchased and queue the order email.
+
+    Raises:
+        ShoppingCart.DoesNotExist: If there is no shopping cart for the day, or it was already purchased.
+    """
+
+    shopping_cart = ShoppingCart.objects.select_for_update().get(created_on=today, purchased=False)
+
+    # Process the order
+    shopping_cart.purchased = True
+    shopping_cart.save(update_fields=["purchased", "updated_at"])
+
+    # The email is sent by the outbox worker once the order is committed.
+    queue_email(*get_order_email(order_form))
+
+
+class ProductListCreate(
+    ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, SparseFieldsViewMixin, ListCreateAPIView
+):
+    queryset = Product.objects.with_subclasses().available()
     serializer_class = ProductListCreateSerializer
+    pagination_class = ProductCursorPagination
+
+    def get_validators(self, request: Request) -> Validators:
+        return get_catalog_validators()
+
+
+class ProductImport(GenericAPIView):
+    parser_classes = [MultiPartParser]
+
+    def post(self, request: Request) -> Response:
+        uploaded_file = request.data.get("file")
+        if uploaded_file is None:
+            return Response({"file": ["This field is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get("format") or (CSV if uploaded_file.name.lower().endswith(".csv") else NDJSON)
+        if file_format not in FORMATS:
+            return Response(
+                {"format": [f"{file_format} is an invalid format."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        stream = TextIOWrapper(uploaded_file.file, encoding="utf-8", newline="")
+        report = ProductImporter().import_stream(stream, file_format)
+
+        return Response({"created": report.created, "errors": report.errors})
+
 
+class ProductExport(GenericAPIView):
+    # The "format" query parameter is taken by the renderer negotiation.
+    format_query_param = "export_format"
 
-class ProductRetrieveUpdateDestroy(RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all().filter(is_deleted=False)
+    def get(self, request: Request) -> Response | StreamingHttpResponse:
+        file_format = request.query_params.get(self.format_query_param, NDJSON)
+        if file_format not in FORMATS:
+            return Response(
+                {self.format_query_param: [f"{file_format} is an invalid format."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(CatalogExporter(file_format), content_type="application/gzip")
+        response["Content-Disposition"] = f'attachment; filename="catalog.{file_format}.gz"'
+
+        return response
+
+
+class ProductRetrieveUpdateDestroy(
+    ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, SparseFieldsViewMixin, RetrieveUpdateDestroyAPIView
+):
+    queryset = Product.objects.with_subclasses().available()
     serializer_class = ProductRetrieveUpdateDestroySerializer
 
+    def get_validators(self, request: Request, pk: str) -> Validators:
+        return get_product_validators(pk)
+
     def perform_destroy(self, instance: Product):
         instance.is_deleted = True
         instance.deleted_at = datetime.utcnow()
         instance.save(update_fields=["is_deleted", "deleted_at"])
+        bump_catalog_version()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -51,22 +143,27 @@ class CartItemCreate(CreateAPIView):
     serializer_class = CartItemSerializer
 
 
-class ShoppingCartView(GenericAPIView):
+class CartItemBatchCreate(GenericAPIView):
+    serializer_class = CartItemSerializer
+
+    # Maximum number of products added per request.
+    MAX_BATCH_SIZE = 100
+
+    def post(self, request: Request) -> Response:
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.MAX_BATCH_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(get_shopping_cart_data(datetime.utcnow().date()), status=status.HTTP_201_CREATED)
+
+
+class ShoppingCartView(ReplicaReadMixin, GenericAPIView):
     def get(self, request: Request) -> Response:
         today = datetime.utcnow().today()
 
-        data = {}
-        try:
-            shopping_cart = ShoppingCart.objects.get(created_on=today, purchased=False)
-        except ShoppingCart.DoesNotExist:
-            data["products"] = []
-            data["total_products"] = 0
-        else:
-            cart_items = CartItem.objects.filter(shopping_cart=shopping_cart)
-            data["products"] = CartItemSerializer(cart_items, many=True).data
-            data["total_products"] = sum(cart_item.quantity for cart_item in cart_items)
-
-        return Response(data)
+        return Response(get_shopping_cart_data(today))
 
 
 class OrderView(GenericAPIView):
@@ -81,19 +178,9 @@ class OrderView(GenericAPIView):
             # Return the validation errors in the response
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        @transaction.atomic()
-        def transactional_order():
-            shopping_cart = ShoppingCart.objects.select_for_update().get(created_on=today, purchased=False)
-
-            # Process the order
-            shopping_cart.purchased = True
-            shopping_cart.save(update_fields=["purchased"])
-
         try:
-            transactional_order()
+            place_order(today, serializer.validated_data)
         except ShoppingCart.DoesNotExist:
             return Response({"message": "There is no current shopping cart."}, status=status.HTTP_404_NOT_FOUND)
 
-        send_order_email(serializer.validated_data)
-
         return Response({"message": "Your order has been successfully processed."}, status=status.HTTP_200_OK)
@@ -1,14 +1,68 @@
 import random
+from itertools import cycle, islice
 from datetime import datetime
 from decimal import Decimal
 
 import pytest
 
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import AsyncClient
 from rest_framework.test import APIClient
 
 from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem
 
 
+def create_catalog(size: int) -> list[Product]:
+    """Create `size` products alternating caps and t-shirts.
+
+    `bulk_create` doesn't support multi-table inheritance, so the product rows are bulk created and the
+    subclass rows are saved raw on top of them.
+    """
+
+    products = Product.objects.bulk_create([
+        Product(
+            product_type=product_type,
+            type_rank=Product.TYPE_RANKS[product_type],
+            main_color="red",
+            secondary_colors="blue, green",
+            brand="Acme",
+            inclusion_date=datetime.utcnow().date(),
+            photo_url="https://example.com/product.png",
+            unit_price=Decimal(10.0),
+            initial_stock=100,
+            current_stock=80
+        )
+        for product_type in islice(cycle(Product.PRODUCT_TYPES), size)
+    ])
+
+    for product in products:
+        if product.product_type == Product.CAP:
+            subclass_instance = Cap(product_ptr=product, logo_color="black")
+        else:
+            subclass_instance = Tshirt(
+                product_ptr=product, size="L", composition={"cotton": 50, "polyester": 50}, gender="Man",
+                has_sleeves=True
+            )
+        subclass_instance.save_base(raw=True)
+
+    Product.objects.filter(id__in=[product.id for product in products]).rebuild_descriptions()
+
+    return products
+
+
+def asgi_request(method: str, path: str, **kwargs) -> HttpResponse:
+    """Send a request through the ASGI handler, whose middleware chain is async.
+
+    The thread sensitive sync code runs in the calling thread, so it sees the data of the test.
+    """
+
+    async def request():
+        return await getattr(AsyncClient(), method.lower())(path, **kwargs)
+
+    return async_to_sync(request)()
+
+
 @pytest.fixture
 def product() -> Product:
     return Product.objects.create(
@@ -0,0 +1,103 @@
+import pytest
+
+from django.core import mail
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, OutboxEmail
+
+from tests import create_catalog, product, cap_product, tshirt_product, shopping_cart, cart_item, api_client
+
+BASE_URL = "http://127.0.0.1:8000/api/v1/"
+
+ORDER_FORM = {
+    "name": "Jane",
+    "last_name": "Doe",
+    "address": "Barcelona, CP 08001",
+    "email": "jane.doe@gmail.com",
+    "mobile_number": "+34123456789"
+}
+
+
+def assert_same_response(api_client: APIClient, path: str, **kwargs):
+    sync_response = api_client.get(f"{BASE_URL}{path}", **kwargs)
+    async_response = api_client.get(f"{BASE_URL}async/{path}", **kwargs)
+
+    assert async_response.status_code == sync_response.status_code
+    assert async_response["Content-Type"] == sync_response["Content-Type"]
+    assert async_response.content == sync_response.content
+
+
+class TestAsyncViews:
+    @pytest.mark.django_db
+    def test_product_list(self, api_client: APIClient):
+        create_catalog(10)
+
+        assert_same_response(api_client, "products/")
+        # The cached response is the same too.
+        assert_same_response(api_client, "products/")
+
+    @pytest.mark.django_db
+    def test_product_list_invalid_cursor(self, api_client: APIClient):
+        assert_same_response(api_client, "products/", data={"cursor": "invalid"})
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("fields", ["id,unit_price,current_stock", "id,logo_color,size", "id,dummy"])
+    def test_product_sparse_fields(
+        self, api_client: APIClient, cap_product: Cap, tshirt_product: Tshirt, fields: str
+    ):
+        assert_same_response(api_client, "products/", data={"fields": fields})
+        assert_same_response(api_client, f"products/{cap_product.id}/", data={"fields": fields})
+
+    @pytest.mark.django_db
+    def test_product_retrieve(self, api_client: APIClient, cap_product: Cap, tshirt_product: Tshirt):
+        assert_same_response(api_client, f"products/{cap_product.id}/")
+        assert_same_response(api_client, f"products/{tshirt_product.id}/")
+
+    @pytest.mark.django_db
+    def test_product_not_modified(self, api_client: APIClient, cap_product: Cap):
+        for path in ("products/", f"products/{cap_product.id}/"):
+            response = api_client.get(f"{BASE_URL}{path}")
+            async_response = api_client.get(f"{BASE_URL}async/{path}")
+
+            assert async_response["ETag"] == response["ETag"]
+            assert async_response["Last-Modified"] == response["Last-Modified"]
+
+            async_response = api_client.get(f"{BASE_URL}async/{path}", HTTP_IF_NONE_MATCH=response["ETag"])
+            assert async_response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert async_response["ETag"] == response["ETag"]
+
+    @pytest.mark.django_db
+    def test_product_retrieve_not_found(self, api_client: APIClient, product: Product):
+        Product.objects.filter(id=product.id).update(is_deleted=True)
+
+        assert_same_response(api_client, f"products/{product.id}/")
+
+    @pytest.mark.django_db
+    def test_shopping_cart(self, api_client: APIClient, cart_item: CartItem, cap_product: Cap):
+        CartItem.objects.create(shopping_cart=cart_item.shopping_cart, product=cap_product, quantity=3)
+
+        assert_same_response(api_client, "view_cart/")
+
+    @pytest.mark.django_db
+    def test_shopping_cart_empty(self, api_client: APIClient):
+        assert_same_response(api_client, "view_cart/")
+
+    @pytest.mark.django_db
+    def test_order(self, api_client: APIClient, cart_item: CartItem):
+        response = api_client.post(f"{BASE_URL}async/order/", data=ORDER_FORM, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b'{"message":"Your order has been successfully processed."}'
+        assert not ShoppingCart.objects.filter(purchased=False).exists()
+        assert OutboxEmail.objects.get().recipients == [ORDER_FORM["email"]]
+        assert len(mail.outbox) == 0
+
+    @pytest.mark.django_db
+    def test_order_errors(self, api_client: APIClient):
+        for data in (ORDER_FORM, {"name": "Jane"}):
+            sync_response = api_client.post(f"{BASE_URL}order/", data=data, format="json")
+            async_response = api_client.post(f"{BASE_URL}async/order/", data=data, format="json")
+
+            assert async_response.status_code == sync_response.status_code
+            assert async_response.content == sync_response.content
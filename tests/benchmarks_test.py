@@ -0,0 +1,46 @@
+import pytest
+
+from django.test import Client
+
+from benchmarks.api import State, compare, run_scenarios, seed_catalog
+from products.models import Product, Cap, Tshirt
+
+
+def test_compare():
+    baseline = {
+        "view_cart/": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 30, "queries": 2, "peak_memory_kib": 100},
+    }
+    results = {
+        "view_cart/": {"p50_ms": 12, "p95_ms": 26, "p99_ms": 30, "queries": 3, "peak_memory_kib": 90},
+        "order/": {"p50_ms": 100, "p95_ms": 100, "p99_ms": 100, "queries": 100, "peak_memory_kib": 100},
+    }
+
+    regressions = compare(results, baseline, threshold=0.25)
+
+    # The p50 is within the threshold and the scenario missing from the baseline isn't compared.
+    assert regressions == [
+        "view_cart/: p95_ms went from 20 to 26",
+        "view_cart/: queries went from 2 to 3",
+    ]
+
+
+@pytest.mark.django_db
+def test_run_scenarios():
+    product_ids = seed_catalog(6, batch_size=4)
+
+    results = run_scenarios(State(Client(), product_ids), 6, [2, 6], iterations=2)
+
+    assert Cap.objects.count() == Tshirt.objects.count() == 3
+    assert Product.objects.filter(description="").count() == 0
+    assert list(results) == [
+        "products/ catalog=6",
+        "products/<pk>/ catalog=6",
+        "update_product_stock catalog=6",
+        "add_product/ catalog=6 cart=2",
+        "add_product/ catalog=6 cart=6",
+        "view_cart/ catalog=6 cart=2",
+        "view_cart/ catalog=6 cart=6",
+        "order/ catalog=6 cart=2",
+        "order/ catalog=6 cart=6",
+    ]
+    assert all(metrics["queries"] > 0 and metrics["iterations"] == 2 for metrics in results.values())
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from django.core.cache import cache
+
+from products.cache import CATALOG_VERSION_KEY, bump_catalog_version, get_catalog_version, get_or_build
+
+
+class TestCatalogVersion:
+    def test_get_catalog_version_initializes_version(self):
+        version = get_catalog_version()
+
+        assert version is not None
+        assert cache.get(CATALOG_VERSION_KEY) == version
+        assert get_catalog_version() == version
+
+    @pytest.mark.django_db
+    def test_bump_catalog_version_on_commit(self, django_capture_on_commit_callbacks):
+        version = get_catalog_version()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            bump_catalog_version()
+            assert get_catalog_version() == version
+
+        assert len(callbacks) == 1
+        assert get_catalog_version() != version
+
+    @pytest.mark.django_db
+    def test_bump_catalog_version_evicted(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            bump_catalog_version()
+
+        assert cache.get(CATALOG_VERSION_KEY) is not None
+
+
+class TestGetOrBuild:
+    def test_builds_and_caches_value(self, mocker: MockerFixture):
+        build = mocker.Mock(return_value={"id": 1})
+
+        assert get_or_build("key", build, timeout=60) == {"id": 1}
+        assert get_or_build("key", build, timeout=60) == {"id": 1}
+        build.assert_called_once()
+        assert cache.get("key:lock") is None
+
+    def test_none_is_not_cached(self, mocker: MockerFixture):
+        build = mocker.Mock(return_value=None)
+
+        assert get_or_build("key", build, timeout=60) is None
+        assert get_or_build("key", build, timeout=60) is None
+        assert build.call_count == 2
+
+    def test_lock_released_on_error(self, mocker: MockerFixture):
+        build = mocker.Mock(side_effect=RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            get_or_build("key", build, timeout=60)
+
+        assert cache.get("key:lock") is None
+
+    def test_waits_for_rebuild_in_progress(self, mocker: MockerFixture):
+        build = mocker.Mock(return_value={"id": 2})
+        cache.add("key:lock", True)
+
+        def rebuild():
+            time.sleep(0.1)
+            cache.set("key", {"id": 1})
+            cache.delete("key:lock")
+
+        thread = threading.Thread(target=rebuild)
+        thread.start()
+        value = get_or_build("key", build, timeout=60)
+        thread.join()
+
+        assert value == {"id": 1}
+        build.assert_not_called()
+
+    def test_single_rebuild_under_concurrency(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"id": 1}
+
+        values = []
+        threads = [
+            threading.Thread(target=lambda: values.append(get_or_build("key", build, timeout=60)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert values == [{"id": 1}] * 10
+        assert len(calls) == 1
@@ -0,0 +1,153 @@
+import csv
+import gzip
+import json
+from datetime import datetime, timezone
+from importlib import import_module
+from io import StringIO
+
+import pytest
+from pytest_mock import MockerFixture
+
+from django.apps import apps
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from products.management.commands import seed_initial_data
+from products.models import Product, Cap, Tshirt, StockMovement, StockSnapshot, AppliedFixture
+from products.outbox import queue_email
+
+from tests import create_catalog, product, cap_product, tshirt_product
+from tests.importer_test import CAP_ROW, TSHIRT_ROW
+
+
+class TestRebuildProductDescriptions:
+    @pytest.mark.django_db
+    def test_rebuild_product_descriptions(self, product: Product, tshirt_product: Tshirt):
+        Product.objects.update(description="")
+        out = StringIO()
+
+        call_command("rebuild_product_descriptions", "--batch-size", "1", stdout=out)
+
+        assert "Rebuilt the description of 2 products." in out.getvalue()
+        assert not Product.objects.filter(description="").exists()
+
+
+class TestRebuildCurrentStock:
+    @pytest.mark.django_db
+    def test_rebuild_current_stock(self, cap_product: Cap, tshirt_product: Tshirt):
+        # The products predate the ledger, the migration that creates it seeds their opening balance.
+        import_module("products.migrations.0009_stock_ledger").seed_opening_snapshots(apps, None, batch_size=1)
+        movement = StockMovement.objects.create(product=cap_product, quantity=-5, reason=StockMovement.ADD_TO_CART)
+        StockSnapshot.objects.create(product=cap_product, stock=60, last_movement_id=movement.id)
+        StockMovement.objects.create(product=cap_product, quantity=-10, reason=StockMovement.ADD_TO_CART)
+        out = StringIO()
+
+        call_command("rebuild_current_stock", "--batch-size", "1", stdout=out)
+
+        cap_product.refresh_from_db()
+        tshirt_product.refresh_from_db()
+        assert cap_product.current_stock == 50
+        assert tshirt_product.current_stock == 80
+        assert "Rebuilt the current stock of 1 products." in out.getvalue()
+
+
+class TestImportProducts:
+    @pytest.mark.django_db
+    def test_import_products(self, tmp_path):
+        path = tmp_path / "products.ndjson"
+        path.write_text("\n".join([json.dumps(CAP_ROW), json.dumps(TSHIRT_ROW | {"gender": "Unknown"})]))
+        out = StringIO()
+        err = StringIO()
+
+        call_command("import_products", str(path), stdout=out, stderr=err)
+
+        assert Cap.objects.count() == 1
+        assert not Tshirt.objects.exists()
+        assert "Imported 1 products, 1 rows with errors." in out.getvalue()
+        assert json.loads(err.getvalue())["row"] == 2
+
+
+class TestExportCatalog:
+    @pytest.mark.django_db
+    def test_export_catalog(self, tmp_path, cap_product: Cap, tshirt_product: Tshirt):
+        path = tmp_path / "catalog.csv.gz"
+        out = StringIO()
+
+        call_command("export_catalog", str(path), "--chunk-size", "1", stdout=out)
+
+        with gzip.open(path, "rt") as file:
+            rows = list(csv.DictReader(file))
+        assert [int(row["id"]) for row in rows] == [cap_product.id, tshirt_product.id]
+        assert rows[0]["logo_color"] == cap_product.logo_color
+        assert f"Exported 2 products to {path}." in out.getvalue()
+
+
+class TestSeedInitialData:
+    @pytest.mark.django_db
+    def test_seed_initial_data(self, mocker: MockerFixture):
+        load_data = mocker.spy(seed_initial_data, "call_command")
+        out = StringIO()
+
+        call_command("seed_initial_data", stdout=out)
+        call_command("seed_initial_data", stdout=out)
+
+        load_data.assert_called_once_with("loaddata", seed_initial_data.INITIAL_FIXTURE, verbosity=0)
+        assert Product.objects.exists()
+        assert AppliedFixture.objects.get(name=seed_initial_data.INITIAL_FIXTURE).fingerprint
+        assert "is already loaded, skipping it." in out.getvalue()
+
+    @pytest.mark.django_db
+    def test_seed_initial_data_fixture_changed(self, mocker: MockerFixture):
+        AppliedFixture.objects.create(name=seed_initial_data.INITIAL_FIXTURE, fingerprint="outdated")
+        load_data = mocker.spy(seed_initial_data, "call_command")
+
+        call_command("seed_initial_data", stdout=StringIO())
+
+        load_data.assert_called_once()
+        assert AppliedFixture.objects.get().fingerprint != "outdated"
+
+    @pytest.mark.django_db
+    def test_seed_initial_data_reload_keeps_stock(self):
+        call_command("seed_initial_data", stdout=StringIO())
+        sold_product, restocked_product, removed_product = Product.objects.order_by("id")[:3]
+        other_product, = create_catalog(1)
+        StockMovement.objects.create(product=sold_product, quantity=-3, reason=StockMovement.ADD_TO_CART)
+        Product.objects.filter(id=sold_product.id).update(current_stock=F("current_stock") - 3)
+        Product.objects.filter(id=restocked_product.id).update(initial_stock=50, current_stock=50)
+        Product.objects.filter(id=removed_product.id).delete()
+        Product.objects.filter(id=other_product.id).update(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+        call_command("seed_initial_data", "--force", stdout=StringIO())
+
+        assert Product.objects.get(id=sold_product.id).current_stock == sold_product.current_stock - 3
+        assert Product.objects.values("initial_stock", "current_stock").get(id=restocked_product.id) == {
+            "initial_stock": 50, "current_stock": 50
+        }
+        assert Product.objects.get(id=removed_product.id).current_stock == removed_product.current_stock
+        assert not StockMovement.objects.filter(reason=StockMovement.ADJUSTMENT).exists()
+        products = Product.objects.with_ledger_stock().exclude(id=other_product.id)
+        assert all(product.current_stock == product.ledger_stock for product in products)
+        assert Product.objects.get(id=other_product.id).updated_at.year == 2020
+
+    @pytest.mark.django_db
+    def test_app_ready_does_not_query_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            apps.get_app_config("products").ready()
+
+        assert len(queries) == 0
+
+
+class TestSendOutboxEmails:
+    @pytest.mark.django_db
+    def test_send_outbox_emails(self):
+        for i in range(3):
+            queue_email("Your order has been send", "Message", "shopping_cart@gmail.com", [f"user{i}@gmail.com"])
+        out = StringIO()
+
+        call_command("send_outbox_emails", "--batch-size", "2", stdout=out)
+
+        assert len(mail.outbox) == 3
+        assert "Sent 3 emails." in out.getvalue()
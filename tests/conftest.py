@@ -0,0 +1,17 @@
+import pytest
+
+from django.core.cache import cache
+
+from products.timing import RAISE
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    settings.QUERY_BUDGET_ACTION = RAISE
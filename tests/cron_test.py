@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from products.cron import STOCK_RECONCILIATION_JOB, take_stock_snapshots, update_product_stock
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, JobWatermark, StockMovement, StockSnapshot
+
+from tests import cap_product, tshirt_product, shopping_cart
+
+
+class TestUpdateProductStock:
+    @pytest.mark.django_db
+    def test_first_run_reconciles_all_products(self, cap_product: Cap, tshirt_product: Tshirt):
+        purchased_cart = ShoppingCart.objects.create(purchased=True)
+        CartItem.objects.create(shopping_cart=purchased_cart, product=cap_product, quantity=7)
+        CartItem.objects.create(shopping_cart=purchased_cart, product=tshirt_product, quantity=3)
+
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        tshirt_product.refresh_from_db()
+        assert cap_product.current_stock == cap_product.initial_stock - 7
+        assert tshirt_product.current_stock == tshirt_product.initial_stock - 3
+        assert JobWatermark.objects.filter(job=STOCK_RECONCILIATION_JOB).exists()
+
+    @pytest.mark.django_db
+    def test_reconciliation_records_movements(self, cap_product: Cap):
+        purchased_cart = ShoppingCart.objects.create(purchased=True)
+        CartItem.objects.create(shopping_cart=purchased_cart, product=cap_product, quantity=7)
+        current_stock = cap_product.current_stock
+
+        update_product_stock()
+
+        movement = StockMovement.objects.get(product=cap_product)
+        assert movement.quantity == cap_product.initial_stock - 7 - current_stock
+        assert movement.reason == StockMovement.RECONCILIATION
+
+    @pytest.mark.django_db
+    def test_first_run_keeps_stock_of_products_without_items(self, cap_product: Cap):
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == 80
+        assert not StockMovement.objects.exists()
+
+    @pytest.mark.django_db
+    def test_only_changed_products_are_updated(
+        self, cap_product: Cap, tshirt_product: Tshirt, shopping_cart: ShoppingCart
+    ):
+        update_product_stock()
+        watermark = JobWatermark.objects.get(job=STOCK_RECONCILIATION_JOB)
+
+        # Changed outside the job, it must not be touched without cart activity.
+        Cap.objects.filter(id=cap_product.id).update(current_stock=1)
+        CartItem.objects.create(shopping_cart=shopping_cart, product=tshirt_product, quantity=4)
+
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        tshirt_product.refresh_from_db()
+        assert cap_product.current_stock == 1
+        assert tshirt_product.current_stock == tshirt_product.initial_stock - 4
+        assert JobWatermark.objects.get(job=STOCK_RECONCILIATION_JOB).processed_until > watermark.processed_until
+
+    @pytest.mark.django_db
+    def test_items_committed_after_previous_run_are_reconciled(
+        self, cap_product: Cap, shopping_cart: ShoppingCart
+    ):
+        cart_item = CartItem.objects.create(shopping_cart=shopping_cart, product=cap_product, quantity=1)
+        update_product_stock()
+        watermark = JobWatermark.objects.get(job=STOCK_RECONCILIATION_JOB)
+
+        # Timestamped before the previous run, but committed after it read the carts.
+        CartItem.objects.filter(id=cart_item.id).update(
+            quantity=3, updated_at=watermark.processed_until - timedelta(seconds=1)
+        )
+
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == cap_product.initial_stock - 3
+
+    @pytest.mark.django_db
+    def test_purchased_cart_is_counted(self, cap_product: Cap, shopping_cart: ShoppingCart):
+        CartItem.objects.create(shopping_cart=shopping_cart, product=cap_product, quantity=5)
+        update_product_stock()
+
+        shopping_cart.purchased = True
+        shopping_cart.save(update_fields=["purchased", "updated_at"])
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == cap_product.initial_stock - 5
+
+    @pytest.mark.django_db
+    def test_abandoned_cart_releases_stock(self, cap_product: Cap, shopping_cart: ShoppingCart):
+        CartItem.objects.create(shopping_cart=shopping_cart, product=cap_product, quantity=5)
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == cap_product.initial_stock - 5
+
+        # The day ends without the cart being purchased.
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        ShoppingCart.objects.filter(id=shopping_cart.id).update(created_on=yesterday)
+        JobWatermark.objects.update(
+            processed_until=datetime.combine(yesterday, datetime.min.time(), tzinfo=timezone.utc)
+        )
+
+        update_product_stock()
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == cap_product.initial_stock
+
+
+class TestTakeStockSnapshots:
+    @pytest.mark.django_db
+    def test_take_stock_snapshots(self, cap_product: Cap, tshirt_product: Tshirt):
+        movement = StockMovement.objects.create(product=cap_product, quantity=-5, reason=StockMovement.ADD_TO_CART)
+
+        take_stock_snapshots(batch_size=1)
+
+        snapshot = StockSnapshot.objects.get()
+        assert snapshot.product_id == cap_product.id
+        assert snapshot.stock == cap_product.initial_stock - 5
+        assert snapshot.last_movement_id == movement.id
+
+    @pytest.mark.django_db
+    def test_take_stock_snapshots_skips_unchanged_products(self, cap_product: Cap):
+        StockMovement.objects.create(product=cap_product, quantity=-5, reason=StockMovement.ADD_TO_CART)
+        take_stock_snapshots()
+        take_stock_snapshots()
+
+        assert StockSnapshot.objects.count() == 1
+
+        StockMovement.objects.create(product=cap_product, quantity=-1, reason=StockMovement.ADD_TO_CART)
+        take_stock_snapshots()
+
+        assert StockSnapshot.objects.count() == 2
+        assert Product.objects.with_ledger_stock().get(id=cap_product.id).ledger_stock == cap_product.initial_stock - 6
@@ -0,0 +1,55 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+import pytest
+
+from products.exporter import CatalogExporter, get_export_columns
+from products.formats import CSV, NDJSON
+from products.importer import ProductImporter, read_csv
+from products.models import Product, Cap, Tshirt
+from products.serializers import ProductListCreateSerializer
+
+from tests import create_catalog
+
+
+def decompress(exporter: CatalogExporter) -> str:
+    return gzip.decompress(b"".join(exporter)).decode()
+
+
+class TestCatalogExporter:
+    @pytest.mark.django_db
+    def test_export_ndjson(self):
+        products = create_catalog(5)
+        Product.objects.filter(id=products[0].id).update(is_deleted=True)
+        exporter = CatalogExporter(NDJSON, chunk_size=2)
+
+        rows = [json.loads(line) for line in decompress(exporter).splitlines()]
+
+        expected = ProductListCreateSerializer(
+            Product.objects.with_subclasses().available().order_by("id"), many=True
+        ).data
+        assert rows == json.loads(json.dumps(expected))
+        assert exporter.exported == 4
+
+    @pytest.mark.django_db
+    def test_export_csv(self):
+        create_catalog(4)
+
+        content = decompress(CatalogExporter(CSV))
+        rows = list(csv.DictReader(StringIO(content)))
+
+        assert len(rows) == 4
+        assert list(rows[0]) == get_export_columns()
+        assert {"logo_color", "size", "composition", "gender", "has_sleeves"} <= set(rows[0])
+
+        # The exported file can be imported back.
+        Product.objects.all().delete()
+        report = ProductImporter().import_rows(
+            row | {"initial_stock": row["current_stock"]} for row in read_csv(StringIO(content))
+        )
+
+        assert report.created == 4
+        assert report.errors == []
+        assert Cap.objects.count() == Tshirt.objects.count() == 2
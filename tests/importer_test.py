@@ -0,0 +1,105 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+
+from products.formats import CSV, NDJSON
+from products.importer import ProductImporter
+from products.models import Product, Cap, Tshirt
+
+CAP_ROW = {
+    "product_type": Product.CAP,
+    "main_color": "Red",
+    "secondary_colors": "Yellow, Blue",
+    "brand": "Nike",
+    "inclusion_date": "2023-01-01",
+    "photo_url": "https://example.com/cap.png",
+    "unit_price": "10.99",
+    "initial_stock": 90,
+    "logo_color": "Black"
+}
+
+TSHIRT_ROW = {
+    "product_type": Product.TSHIRT,
+    "main_color": "Gray",
+    "secondary_colors": "Green, White",
+    "brand": "Acme",
+    "inclusion_date": "2023-01-02",
+    "photo_url": "https://example.com/tshirt.png",
+    "unit_price": "10.0",
+    "initial_stock": 100,
+    "size": "L",
+    "composition": {"cotton": 50, "polyester": 50},
+    "gender": "Man",
+    "has_sleeves": True
+}
+
+
+def to_ndjson(rows: list) -> StringIO:
+    return StringIO("\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n")
+
+
+def to_csv(rows: list[dict]) -> StringIO:
+    stream = StringIO()
+    writer = csv.DictWriter(stream, fieldnames=list(dict.fromkeys(key for row in rows for key in row)))
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            key: json.dumps(value) if isinstance(value, dict) else value for key, value in row.items()
+        })
+
+    stream.seek(0)
+    return stream
+
+
+class TestProductImporter:
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("file_format, build_stream", [(NDJSON, to_ndjson), (CSV, to_csv)])
+    def test_import_stream(self, file_format: str, build_stream):
+        report = ProductImporter(batch_size=1).import_stream(build_stream([CAP_ROW, TSHIRT_ROW]), file_format)
+
+        assert report.created == 2
+        assert report.errors == []
+
+        cap = Cap.objects.get()
+        tshirt = Tshirt.objects.get()
+        assert cap.logo_color == "Black"
+        assert cap.current_stock == cap.initial_stock == 90
+        assert cap.type_rank == Product.TYPE_RANKS[Product.CAP]
+        assert cap.description == cap.build_description()
+        assert tshirt.composition == {"cotton": 50, "polyester": 50}
+        assert tshirt.has_sleeves
+        assert tshirt.type_rank == Product.TYPE_RANKS[Product.TSHIRT]
+        assert tshirt.description == tshirt.build_description()
+
+    @pytest.mark.django_db
+    def test_import_stream_reports_invalid_rows(self):
+        rows = [
+            CAP_ROW,
+            "not json",
+            CAP_ROW | {"initial_stock": -1},
+            TSHIRT_ROW | {"gender": "Unknown"},
+            TSHIRT_ROW | {"composition": {"cotton": 50}},
+            CAP_ROW | {"product_type": "Hat"},
+            TSHIRT_ROW
+        ]
+
+        report = ProductImporter(batch_size=3).import_stream(to_ndjson(rows), NDJSON)
+
+        assert report.created == 2
+        assert [error["row"] for error in report.errors] == [2, 3, 4, 5, 6]
+        assert "non_field_errors" in report.errors[0]["errors"]
+        assert "initial_stock" in report.errors[1]["errors"]
+        assert "gender" in report.errors[2]["errors"]
+        assert "composition" in report.errors[3]["errors"]
+        assert "product_type" in report.errors[4]["errors"]
+        assert Cap.objects.count() == 1
+        assert Tshirt.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_import_rows_bumps_catalog_version(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            ProductImporter().import_rows([CAP_ROW])
+
+        assert len(callbacks) == 1
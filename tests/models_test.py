@@ -1,12 +1,14 @@
 import random
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timezone
 
 import pytest
 
-from products.models import Product, Tshirt, ShoppingCart, CartItem
+from django.db import IntegrityError
 
-from tests import product, tshirt_product, shopping_cart
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, StockMovement, StockSnapshot
+
+from tests import product, cap_product, tshirt_product, shopping_cart
 
 
 class TestProduct:
@@ -26,6 +28,12 @@ class TestProduct:
 
         assert product.is_deleted is False
 
+    @pytest.mark.django_db
+    def test_type_rank(self, cap_product: Cap, tshirt_product: Tshirt):
+        assert cap_product.type_rank == Product.TYPE_RANKS[Product.CAP]
+        assert tshirt_product.type_rank == Product.TYPE_RANKS[Product.TSHIRT]
+        assert cap_product.type_rank < tshirt_product.type_rank
+
     @pytest.mark.django_db
     def test_product_description(self, product: Product):
         description = f"{product.main_color} {product.brand} {product.get_product_type_display()} with secondary " \
@@ -35,9 +43,49 @@ class TestProduct:
 
     @pytest.mark.django_db
     def test_thisrt_description(self, tshirt_product: Tshirt):
-        description = f"{tshirt_product.product_ptr.description}, size {tshirt_product.size}, composition " \
+        description = f"{Product.build_description(tshirt_product)}, size {tshirt_product.size}, composition " \
                       f"{tshirt_product.composition_display}"
         assert tshirt_product.description == description
+        assert tshirt_product.product_ptr.description == description
+
+    @pytest.mark.django_db
+    def test_description_updated_on_save(self, tshirt_product: Tshirt):
+        tshirt_product.main_color = "blue"
+        tshirt_product.size = "XL"
+        tshirt_product.save(update_fields=["main_color", "size"])
+
+        tshirt_product.refresh_from_db()
+        assert tshirt_product.description.startswith("blue Acme Tshirt")
+        assert ", size XL," in tshirt_product.description
+
+    @pytest.mark.django_db
+    def test_rebuild_descriptions(self, product: Product, tshirt_product: Tshirt):
+        Product.objects.update(description="")
+
+        assert Product.objects.rebuild_descriptions(batch_size=1) == 2
+
+        product.refresh_from_db()
+        tshirt_product.refresh_from_db()
+        assert product.description == product.build_description()
+        assert tshirt_product.description == tshirt_product.build_description()
+
+    @pytest.mark.django_db
+    def test_updated_at_touched_by_writes(self, cap_product: Cap, tshirt_product: Tshirt):
+        Product.objects.update(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+        tshirt_product.size = "XL"
+        tshirt_product.save(update_fields=["size"])
+        assert Product.objects.decrement_stock(cap_product.id, 1)
+
+        for subclass_product in (cap_product, tshirt_product):
+            subclass_product.refresh_from_db()
+            assert subclass_product.updated_at.year > 2020
+
+        Product.objects.update(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        Product.objects.bulk_update([cap_product], ["current_stock"])
+
+        cap_product.refresh_from_db()
+        assert cap_product.updated_at.year > 2020
 
     @pytest.mark.django_db
     def test_composition_display(self, tshirt_product: Tshirt):
@@ -45,6 +93,35 @@ class TestProduct:
         assert tshirt_product.composition_display == composition_display
 
 
+class TestProductLedgerStock:
+    @pytest.mark.django_db
+    def test_ledger_stock_without_movements(self, product: Product):
+        product = Product.objects.with_ledger_stock().get(id=product.id)
+
+        assert product.ledger_stock == product.initial_stock
+        assert product.last_movement_id == 0
+
+    @pytest.mark.django_db
+    def test_ledger_stock_from_initial_stock(self, product: Product):
+        StockMovement.objects.create(product=product, quantity=-5, reason=StockMovement.ADD_TO_CART)
+        movement = StockMovement.objects.create(product=product, quantity=2, reason=StockMovement.ADD_TO_CART)
+
+        product = Product.objects.with_ledger_stock().get(id=product.id)
+
+        assert product.ledger_stock == product.initial_stock - 3
+        assert product.last_movement_id == movement.id
+
+    @pytest.mark.django_db
+    def test_ledger_stock_from_snapshot(self, product: Product):
+        movement = StockMovement.objects.create(product=product, quantity=-5, reason=StockMovement.ADD_TO_CART)
+        StockSnapshot.objects.create(product=product, stock=50, last_movement_id=movement.id)
+        StockMovement.objects.create(product=product, quantity=-4, reason=StockMovement.ADD_TO_CART)
+
+        product = Product.objects.with_ledger_stock().get(id=product.id)
+
+        assert product.ledger_stock == 46
+
+
 class TestShoppingCart:
     @pytest.mark.django_db
     def test_purchased_default_value(self):
@@ -66,3 +143,34 @@ class TestCartItem:
         cart_item = CartItem.objects.create(product=product, shopping_cart=shopping_cart)
 
         assert cart_item.quantity == 0
+
+    @pytest.mark.django_db
+    def test_unique_cart_line(self, product: Product, shopping_cart: ShoppingCart):
+        CartItem.objects.create(product=product, shopping_cart=shopping_cart)
+
+        with pytest.raises(IntegrityError):
+            CartItem.objects.create(product=product, shopping_cart=shopping_cart)
+
+    @pytest.mark.django_db
+    def test_add_quantities(self, cap_product: Cap, tshirt_product: Tshirt, shopping_cart: ShoppingCart):
+        CartItem.objects.create(product=cap_product, shopping_cart=shopping_cart, quantity=2)
+
+        cart_items = CartItem.objects.add_quantities(shopping_cart.id, {cap_product.id: 3, tshirt_product.id: 4})
+
+        assert {(cart_item.product_id, cart_item.quantity) for cart_item in cart_items} == {
+            (cap_product.id, 5), (tshirt_product.id, 4)
+        }
+        assert CartItem.objects.filter(shopping_cart=shopping_cart).count() == 2
+
+    @pytest.mark.django_db
+    def test_add_quantities_not_below_zero(self, product: Product, shopping_cart: ShoppingCart):
+        CartItem.objects.create(product=product, shopping_cart=shopping_cart, quantity=2)
+
+        cart_item, = CartItem.objects.add_quantities(shopping_cart.id, {product.id: -5})
+
+        assert cart_item.quantity == 0
+        assert CartItem.objects.get(id=cart_item.id).quantity == 0
+
+    @pytest.mark.django_db
+    def test_add_quantities_empty(self, shopping_cart: ShoppingCart):
+        assert CartItem.objects.add_quantities(shopping_cart.id, {}) == []
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.utils import timezone
+
+from products.models import OutboxEmail
+from products.outbox import RETRY_BASE_DELAY, queue_email, send_pending_emails
+
+
+def queue_emails(count: int) -> list[OutboxEmail]:
+    return [
+        queue_email("Your order has been send", f"Message {i}", "shopping_cart@gmail.com", [f"user{i}@gmail.com"])
+        for i in range(count)
+    ]
+
+
+class TestSendPendingEmails:
+    @pytest.mark.django_db
+    def test_send_pending_emails(self, mocker: MockerFixture):
+        queue_emails(3)
+        get_connection = mocker.spy(mail, "get_connection")
+        mocker.patch("products.outbox.get_connection", get_connection)
+
+        assert send_pending_emails() == 3
+
+        get_connection.assert_called_once()
+        assert [message.to for message in mail.outbox] == [[f"user{i}@gmail.com"] for i in range(3)]
+        assert not OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists()
+        assert send_pending_emails() == 0
+        assert len(mail.outbox) == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_send_pending_emails_outside_transaction(self, mocker: MockerFixture):
+        queue_emails(2)
+        send_messages = EmailBackend.send_messages
+        states = []
+
+        def record_state(self, messages):
+            # No lock is held while the mail server is contacted, and the batch is leased to this worker.
+            states.append((connection.in_atomic_block, send_pending_emails()))
+            return send_messages(self, messages)
+
+        mocker.patch.object(EmailBackend, "send_messages", record_state)
+
+        assert send_pending_emails() == 2
+
+        assert states == [(False, 0), (False, 0)]
+        assert not OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists()
+
+    @pytest.mark.django_db
+    def test_send_pending_emails_batch_size(self):
+        queue_emails(3)
+
+        assert send_pending_emails(batch_size=2) == 2
+        assert OutboxEmail.objects.filter(status=OutboxEmail.PENDING).count() == 1
+
+    @pytest.mark.django_db
+    def test_send_pending_emails_retries_with_backoff(self, mocker: MockerFixture):
+        failing_email, email = queue_emails(2)
+        send_messages = EmailBackend.send_messages
+
+        def fail_first(self, messages):
+            if messages[0].to == failing_email.recipients:
+                raise ConnectionError("Mail server unavailable")
+            return send_messages(self, messages)
+
+        mocker.patch.object(EmailBackend, "send_messages", fail_first)
+
+        assert send_pending_emails() == 1
+
+        failing_email.refresh_from_db()
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.SENT
+        assert failing_email.status == OutboxEmail.PENDING
+        assert failing_email.attempts == 1
+        assert "Mail server unavailable" in failing_email.last_error
+        assert failing_email.next_attempt_at >= failing_email.created_at + timedelta(seconds=RETRY_BASE_DELAY)
+        # It isn't retried before its next attempt is due.
+        assert send_pending_emails() == 0
+
+    @pytest.mark.django_db
+    def test_send_pending_emails_marks_failed(self, mocker: MockerFixture):
+        email, = queue_emails(1)
+        mocker.patch.object(EmailBackend, "send_messages", side_effect=ConnectionError)
+
+        for _ in range(2):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            send_pending_emails(max_attempts=2)
+
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.FAILED
+        assert email.attempts == 2
+        assert len(mail.outbox) == 0
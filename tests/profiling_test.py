@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from rest_framework.test import APIClient
+
+from products.profiling import PROFILE_HEADER, SamplingProfiler, format_call_tree, format_folded, write_profile
+from products.views import ShoppingCartView
+
+from tests import api_client
+
+URL = "http://127.0.0.1:8000/api/v1/view_cart/"
+
+
+def slow_shopping_cart_data(today) -> dict:
+    time.sleep(0.1)
+    return {"products": [], "total_products": 0}
+
+
+@pytest.fixture
+def profiling(settings, tmp_path: Path) -> Path:
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_INTERVAL = 0.001
+
+    return tmp_path
+
+
+class TestSamplingProfiler:
+    def test_sampling_error(self, mocker: MockerFixture):
+        samples = []
+
+        def get_stack(frame) -> tuple[str, ...]:
+            samples.append(frame)
+            if len(samples) == 1:
+                raise RuntimeError
+            return ("tests.profiling_test.function:1", )
+
+        mocker.patch("products.profiling.get_stack", get_stack)
+        profiler = SamplingProfiler(0.001)
+        thread_id = threading.get_ident()
+
+        stacks = profiler.profile(thread_id)
+        time.sleep(0.05)
+        profiler.stop(thread_id)
+
+        # The sampling goes on after the error.
+        assert stacks[("tests.profiling_test.function:1", )] > 0
+        assert profiler.thread.is_alive()
+
+
+class TestProfilingMiddleware:
+    @pytest.mark.django_db
+    def test_profile_header(self, api_client: APIClient, profiling: Path, settings, mocker: MockerFixture):
+        settings.PROFILING_TOKEN = "secret"
+        mocker.patch("products.views.get_shopping_cart_data", slow_shopping_cart_data)
+
+        response = api_client.get(URL, HTTP_X_PROFILE="secret")
+
+        name = response[PROFILE_HEADER]
+        assert name.endswith("-GET-products-view-cart-view")
+        folded = (profiling / f"{name}.folded").read_text()
+        view = f"products.views.get:{ShoppingCartView.get.__code__.co_firstlineno}"
+        function = f"tests.profiling_test.slow_shopping_cart_data:{slow_shopping_cart_data.__code__.co_firstlineno}"
+        assert f"{view};{function} " in folded
+        assert function in (profiling / f"{name}.txt").read_text()
+
+    @pytest.mark.django_db
+    def test_profile_header_wrong_token(self, api_client: APIClient, profiling: Path, settings):
+        settings.PROFILING_TOKEN = "secret"
+
+        response = api_client.get(URL, HTTP_X_PROFILE="guess")
+
+        assert PROFILE_HEADER not in response
+        assert not list(profiling.iterdir())
+
+    @pytest.mark.django_db
+    def test_sample_rate(self, api_client: APIClient, profiling: Path, settings, mocker: MockerFixture):
+        settings.PROFILING_SAMPLE_RATE = 1
+        mocker.patch("products.views.get_shopping_cart_data", slow_shopping_cart_data)
+
+        response = api_client.get(URL)
+
+        assert (profiling / f"{response[PROFILE_HEADER]}.folded").exists()
+
+    @pytest.mark.django_db
+    def test_latency_threshold(self, api_client: APIClient, profiling: Path, settings, mocker: MockerFixture):
+        settings.PROFILING_LATENCY_THRESHOLD = 50
+
+        fast_response = api_client.get(URL)
+        mocker.patch("products.views.get_shopping_cart_data", slow_shopping_cart_data)
+        slow_response = api_client.get(URL)
+
+        assert PROFILE_HEADER not in fast_response
+        assert [path.name for path in profiling.glob("*.folded")] == [f"{slow_response[PROFILE_HEADER]}.folded"]
+
+    @pytest.mark.django_db
+    def test_disabled(self, api_client: APIClient, settings, tmp_path: Path):
+        settings.PROFILING_DIR = str(tmp_path)
+
+        response = api_client.get(URL, HTTP_X_PROFILE="")
+
+        assert PROFILE_HEADER not in response
+
+
+STACKS = Counter({("main", "view", "query"): 6, ("main", "view", "render"): 3, ("main", "log"): 1})
+
+
+def test_format_folded():
+    assert format_folded(STACKS) == "main;view;query 6\nmain;view;render 3\nmain;log 1\n"
+
+
+def test_format_call_tree():
+    assert format_call_tree(STACKS, min_percent=20) == (
+        "10 samples\n"
+        "100.0%     10  main\n"
+        "   90.0%      9  view\n"
+        "     60.0%      6  query\n"
+        "     30.0%      3  render\n"
+    )
+
+
+def test_write_profile_retention(tmp_path: Path):
+    for name in ["20260101T000000000000-a", "20260101T000001000000-b", "20260101T000002000000-c"]:
+        write_profile(tmp_path, name, STACKS, max_profiles=2)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "20260101T000001000000-b.folded", "20260101T000001000000-b.txt",
+        "20260101T000002000000-c.folded", "20260101T000002000000-c.txt",
+    ]
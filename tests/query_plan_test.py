@@ -0,0 +1,132 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.cron import update_product_stock
+from products.models import Product, ShoppingCart, CartItem
+
+from tests import create_catalog, api_client
+
+BASE_URL = "http://127.0.0.1:8000/api/v1/"
+
+# A row of the plan that reads a whole table or index, as opposed to "SEARCH" that seeks into an index.
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+
+ORDER_FORM = {
+    "name": "Jane",
+    "last_name": "Doe",
+    "address": "Barcelona, CP 08001",
+    "email": "jane.doe@gmail.com",
+    "mobile_number": "+34123456789"
+}
+
+
+def get_query_plans(queries: list[dict]) -> dict[str, list[str]]:
+    plans = {}
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query["sql"]
+            if not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plans[sql] = [row[-1] for row in cursor.fetchall()]
+
+    return plans
+
+
+@pytest.fixture
+def large_dataset() -> list[Product]:
+    """Seed a thousand products and the shopping carts of the last hundred days, half of them purchased.
+    """
+
+    products = create_catalog(1_000)
+    today = datetime.utcnow().date()
+
+    for days in range(1, 101):
+        shopping_carts = ShoppingCart.objects.bulk_create([ShoppingCart(purchased=i % 2 == 0) for i in range(5)])
+        ShoppingCart.objects.filter(id__in=[cart.id for cart in shopping_carts]).update(
+            created_on=today - timedelta(days=days)
+        )
+        CartItem.objects.bulk_create([
+            CartItem(shopping_cart=shopping_cart, product=product, quantity=1)
+            for shopping_cart in shopping_carts
+            for product in products[days * 5:days * 5 + 10]
+        ])
+
+    current_cart = ShoppingCart.objects.create()
+    CartItem.objects.bulk_create([
+        CartItem(shopping_cart=current_cart, product=product, quantity=1) for product in products[:10]
+    ])
+
+    # Give the query planner the statistics a production database would have.
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    return products
+
+
+def assert_no_full_scans(queries: list[dict]):
+    full_scans = {
+        sql: plan for sql, plan in get_query_plans(queries).items() if any(FULL_SCAN.search(row) for row in plan)
+    }
+
+    assert not full_scans, "\n\n".join(f"{sql}\n{plan}" for sql, plan in full_scans.items())
+
+
+class TestQueryPlans:
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("method, path, get_data", [
+        ("get", "products/", lambda product_id: None),
+        ("get", "products/{product_id}/", lambda product_id: None),
+        ("post", "add_product/", lambda product_id: {"product_id": product_id, "quantity": 1}),
+        ("post", "add_products/", lambda product_id: [{"product_id": product_id}, {"product_id": product_id + 1}]),
+        ("get", "view_cart/", lambda product_id: None),
+        ("post", "order/", lambda product_id: ORDER_FORM),
+    ])
+    def test_endpoint_query_plans(self, api_client: APIClient, large_dataset: list[Product], method, path, get_data):
+        product_id = large_dataset[5].id
+
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(api_client, method)(
+                BASE_URL + path.format(product_id=product_id), data=get_data(product_id), format="json"
+            )
+
+        assert response.status_code < 400
+        assert_no_full_scans(context.captured_queries)
+
+    @pytest.mark.django_db
+    def test_next_page_query_plans(self, api_client: APIClient, large_dataset: list[Product]):
+        response = api_client.get(f"{BASE_URL}products/")
+
+        with CaptureQueriesContext(connection) as context:
+            api_client.get(response.data["next"])
+
+        assert_no_full_scans(context.captured_queries)
+
+    @pytest.mark.django_db
+    def test_full_scan_detected(self, large_dataset: list[Product]):
+        with pytest.raises(AssertionError, match="SCAN products_cartitem"):
+            assert_no_full_scans([{"sql": "SELECT * FROM products_cartitem WHERE quantity = 2"}])
+
+    @pytest.mark.django_db
+    def test_update_product_stock_query_plans(self, large_dataset: list[Product]):
+        # The carts of past days were last changed long before the previous run.
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        ShoppingCart.objects.update(updated_at=an_hour_ago)
+        CartItem.objects.update(updated_at=an_hour_ago)
+        update_product_stock()
+        CartItem.objects.filter(id__in=CartItem.objects.order_by("-id").values("id")[:5]).update(
+            quantity=2, updated_at=timezone.now()
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            update_product_stock()
+
+        assert_no_full_scans(context.captured_queries)
@@ -0,0 +1,164 @@
+import sqlite3
+from typing import Iterator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from rest_framework.test import APIClient
+
+from products.cache import bump_catalog_version
+from products.models import Product, Cap, CartItem
+from products.replicas import REPLICA_STICKY_COOKIE, ReplicaRouter, _replica_reads, refresh_replica, replica_reads
+
+from tests import asgi_request, product, cap_product, shopping_cart, cart_item, api_client
+
+BASE_URL = "http://127.0.0.1:8000/api/v1/"
+
+
+@pytest.fixture
+def replica_read_flags(mocker: MockerFixture) -> list[bool]:
+    """Record if the reads routed during the test were made inside `replica_reads`.
+    """
+
+    flags = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        flags.append(_replica_reads.get())
+        return db_for_read(self, model, **hints)
+
+    mocker.patch.object(ReplicaRouter, "db_for_read", record)
+    return flags
+
+
+@pytest.fixture(autouse=True)
+def replica_aliases(settings):
+    settings.DATABASE_REPLICA_ALIASES = ["replica_0"]
+
+
+class TestReplicaRouter:
+    def test_db_for_read(self):
+        router = ReplicaRouter()
+
+        assert router.db_for_read(Product) == "default"
+        with replica_reads():
+            assert router.db_for_read(Product) == "replica_0"
+        assert router.db_for_write(Product) == "default"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_db_for_read_in_transaction(self):
+        with replica_reads(), transaction.atomic():
+            assert ReplicaRouter().db_for_read(Product) == "default"
+
+    def test_allow_migrate(self):
+        router = ReplicaRouter()
+
+        assert router.allow_migrate("default", "products")
+        assert not router.allow_migrate("replica_0", "products")
+
+    def test_db_for_read_without_replicas(self, settings):
+        settings.DATABASE_REPLICA_ALIASES = []
+
+        with replica_reads():
+            assert ReplicaRouter().db_for_read(Product) == "default"
+
+
+@pytest.fixture
+def lagging_replica(tmp_path) -> Iterator[str]:
+    """Register `replica_0` as a copy of the primary taken now, which won't see the writes made after it.
+    """
+
+    path = str(tmp_path / "replica.sqlite3")
+    refresh_replica(path)
+    connections.settings["replica_0"] = {**connections.settings[DEFAULT_DB_ALIAS], "NAME": path, "TEST": {}}
+
+    yield path
+
+    connections["replica_0"].close()
+    del connections["replica_0"]
+    del connections.settings["replica_0"]
+
+
+class TestReplicaReads:
+    @pytest.mark.django_db
+    def test_get_reads_from_replica(self, api_client: APIClient, cart_item: CartItem, replica_read_flags: list[bool]):
+        response = api_client.get(f"{BASE_URL}view_cart/")
+
+        assert response.status_code == 200
+        assert replica_read_flags and all(replica_read_flags)
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("path", ["products/", "products/{product_id}/"])
+    def test_catalog_cache_built_from_primary(
+        self, api_client: APIClient, cap_product: Cap, replica_read_flags: list[bool], path: str
+    ):
+        response = api_client.get(BASE_URL + path.format(product_id=cap_product.id))
+
+        assert response.status_code == 200
+        assert replica_read_flags and not any(replica_read_flags)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("path", ["products/", "products/{product_id}/"])
+    def test_lagging_replica_does_not_cache_stale_catalog(self, cap_product: Cap, lagging_replica: str, path: str):
+        Product.objects.filter(id=cap_product.id).update(current_stock=F("current_stock") - 1)
+        bump_catalog_version()
+        url = BASE_URL + path.format(product_id=cap_product.id)
+
+        with replica_reads():
+            assert Product.objects.get(id=cap_product.id).current_stock == cap_product.current_stock
+
+        response = APIClient().get(url)
+        sticky_client = APIClient()
+        sticky_client.cookies[REPLICA_STICKY_COOKIE] = "1"
+        sticky_response = sticky_client.get(url)
+
+        for data in (response.data, sticky_response.data):
+            product_data = data["results"][0] if "results" in data else data
+            assert product_data["current_stock"] == cap_product.current_stock - 1
+
+    @pytest.mark.django_db
+    def test_write_sticks_client_to_primary(
+        self, api_client: APIClient, cap_product: Cap, replica_read_flags: list[bool]
+    ):
+        response = api_client.post(f"{BASE_URL}add_product/", data={"product_id": cap_product.id, "quantity": 1})
+
+        assert response.cookies[REPLICA_STICKY_COOKIE]["max-age"] == 5
+        assert not any(replica_read_flags)
+
+        replica_read_flags.clear()
+        response = api_client.get(f"{BASE_URL}view_cart/")
+
+        assert response.data["total_products"] == 1
+        assert replica_read_flags and not any(replica_read_flags)
+
+    @pytest.mark.django_db
+    def test_write_sticks_client_to_primary_asgi(self, cap_product: Cap):
+        response = asgi_request(
+            "POST", f"{BASE_URL}add_product/", data={"product_id": cap_product.id, "quantity": 1},
+            content_type="application/json"
+        )
+
+        assert response.status_code == 201
+        assert response.cookies[REPLICA_STICKY_COOKIE]["max-age"] == 5
+
+    @pytest.mark.django_db
+    def test_write_without_replicas(self, api_client: APIClient, cap_product: Cap, settings):
+        settings.DATABASE_REPLICA_ALIASES = []
+
+        response = api_client.post(f"{BASE_URL}add_product/", data={"product_id": cap_product.id, "quantity": 1})
+
+        assert REPLICA_STICKY_COOKIE not in response.cookies
+
+
+class TestRefreshReplica:
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_replica(self, tmp_path, product: Product):
+        path = str(tmp_path / "replica.sqlite3")
+
+        refresh_replica(path)
+
+        with sqlite3.connect(path) as replica:
+            assert replica.execute("SELECT id FROM products_product").fetchall() == [(product.id, )]
+        replica.close()
@@ -1,10 +1,14 @@
 import random
+import threading
 from decimal import Decimal
 from datetime import datetime
 
 import pytest
 
-from products.models import Cap, Tshirt, Product, ShoppingCart, CartItem
+from django.db import OperationalError, connection
+from rest_framework import serializers
+
+from products.models import Cap, Tshirt, Product, ShoppingCart, CartItem, StockMovement
 
 from products.serializers import (
     CapSerializer, TshirtSerializer, ProductListCreateSerializer, ProductRetrieveUpdateDestroySerializer,
@@ -306,6 +310,18 @@ class TestProductRetrieveUpdateDestroySerializer:
         assert product.current_stock == data["current_stock"]
         assert product.logo_color == data["logo_color"]
 
+    @pytest.mark.django_db
+    def test_stock_update_records_movement(self, cap_product: Cap):
+        current_stock = cap_product.current_stock
+        serializer = ProductRetrieveUpdateDestroySerializer(data={"current_stock": 50}, partial=True)
+        assert serializer.is_valid()
+
+        serializer.update(cap_product, serializer.validated_data)
+
+        movement = StockMovement.objects.get(product=cap_product)
+        assert movement.quantity == 50 - current_stock
+        assert movement.reason == StockMovement.ADJUSTMENT
+
     @pytest.mark.django_db
     def test_tshirt_type_update(self, tshirt_product: Tshirt):
         data = {
@@ -501,6 +517,10 @@ class TestCartItemSerializer:
         assert cart_item.quantity == current_quantity + data["quantity"]
         assert cart_item.product.current_stock == current_stock - data["quantity"]
 
+        movement = StockMovement.objects.get(product=cart_item.product)
+        assert movement.quantity == -data["quantity"]
+        assert movement.reason == StockMovement.ADD_TO_CART
+
     @pytest.mark.django_db
     def test_cart_item_creation_remove_from_cart_item(self, cart_item: CartItem):
         data = {
@@ -519,6 +539,96 @@ class TestCartItemSerializer:
 
         assert cart_item.quantity == data["quantity"] + current_quantity
 
+    @pytest.mark.django_db
+    def test_cart_item_creation_not_enough_stock(self, cart_item: CartItem):
+        product = cart_item.product
+        serializer = CartItemSerializer(data={"product_id": product.id, "quantity": 1})
+        assert serializer.is_valid()
+
+        # The stock runs out between the validation and the creation.
+        Product.objects.filter(id=product.id).update(current_stock=0)
+
+        with pytest.raises(serializers.ValidationError) as error:
+            serializer.create(serializer.validated_data)
+
+        assert error.value.detail["quantity"] == "Not enough stock available."
+        cart_item.refresh_from_db()
+        assert cart_item.quantity == 5
+        assert not StockMovement.objects.exists()
+
+    @pytest.mark.django_db
+    def test_cart_item_creation_deleted_product(self, product: Product):
+        serializer = CartItemSerializer(data={"product_id": product.id, "quantity": 1})
+        assert serializer.is_valid()
+
+        Product.objects.filter(id=product.id).update(is_deleted=True)
+
+        with pytest.raises(serializers.ValidationError) as error:
+            serializer.create(serializer.validated_data)
+
+        assert error.value.detail["product_id"] == f"Product with id {product.id} does not exist."
+
+    @pytest.mark.django_db
+    def test_cart_item_creation_stale_validation_never_oversells(self, cap_product: Cap):
+        Product.objects.filter(id=cap_product.id).update(current_stock=3)
+        # Both requests validate against the same stock, as they would if they ran at the same time.
+        first_serializer = CartItemSerializer(data={"product_id": cap_product.id, "quantity": 3})
+        second_serializer = CartItemSerializer(data={"product_id": cap_product.id, "quantity": 2})
+        assert first_serializer.is_valid()
+        assert second_serializer.is_valid()
+
+        first_serializer.create(first_serializer.validated_data)
+        with pytest.raises(serializers.ValidationError) as error:
+            second_serializer.create(second_serializer.validated_data)
+
+        assert error.value.detail["quantity"] == "Not enough stock available."
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == 0
+        assert CartItem.objects.get(product=cap_product).quantity == 3
+        assert StockMovement.objects.filter(product=cap_product).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cart_item_creation_concurrent_never_oversells(self, cap_product: Cap):
+        Product.objects.filter(id=cap_product.id).update(current_stock=5)
+        results = []
+
+        def add_to_cart():
+            try:
+                for _ in range(50):
+                    serializer = CartItemSerializer(data={"product_id": cap_product.id, "quantity": 1})
+                    try:
+                        if not serializer.is_valid():
+                            results.append(False)
+                            return
+                        serializer.create(serializer.validated_data)
+                    except serializers.ValidationError:
+                        results.append(False)
+                        return
+                    except OperationalError:
+                        # SQLite reports the write lock of a concurrent transaction as an error, retry.
+                        continue
+
+                    results.append(True)
+                    return
+
+                # Every attempt found the database locked.
+                results.append(None)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add_to_cart) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cap_product.refresh_from_db()
+        assert None not in results
+        assert results.count(True) == 5
+        assert cap_product.current_stock == 0
+        assert CartItem.objects.get(product=cap_product).quantity == 5
+        assert StockMovement.objects.filter(product=cap_product).count() == 5
+
 
 class TestOrderSerializer:
     @pytest.mark.django_db
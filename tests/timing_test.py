@@ -0,0 +1,122 @@
+import logging
+import re
+
+import pytest
+
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.models import CartItem
+from products.timing import LOG, RAISE, QueryBudgetExceeded, RequestMetrics, _request_metrics, timed
+
+from tests import asgi_request, create_catalog, product, shopping_cart, cart_item, api_client
+
+BASE_URL = "http://127.0.0.1:8000/api/v1/"
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries", serialize;dur=(?P<serialize>[\d.]+), '
+    r'render;dur=(?P<render>[\d.]+), total;dur=(?P<total>[\d.]+)$'
+)
+
+
+def get_server_timing(response) -> dict:
+    match = SERVER_TIMING.match(response["Server-Timing"])
+    assert match, response["Server-Timing"]
+
+    return {name: float(value) for name, value in match.groupdict().items()}
+
+
+class TestServerTimingMiddleware:
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("path", ["view_cart/", "async/view_cart/"])
+    def test_server_timing(self, api_client: APIClient, cart_item: CartItem, path: str):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f"{BASE_URL}{path}")
+
+        server_timing = get_server_timing(response)
+        assert response.status_code == status.HTTP_200_OK
+        assert server_timing["queries"] == len(context.captured_queries)
+        assert server_timing["db"] > 0
+        assert server_timing["serialize"] > 0
+        assert server_timing["render"] > 0
+        assert server_timing["total"] >= server_timing["db"] + server_timing["serialize"] + server_timing["render"]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("path", ["view_cart/", "async/view_cart/"])
+    def test_server_timing_asgi(self, cart_item: CartItem, path: str):
+        with CaptureQueriesContext(connection) as context:
+            response = asgi_request("GET", f"{BASE_URL}{path}")
+
+        server_timing = get_server_timing(response)
+        assert response.status_code == status.HTTP_200_OK
+        assert server_timing["queries"] == len(context.captured_queries)
+        assert server_timing["db"] > 0
+        assert server_timing["serialize"] > 0
+
+    def test_asgi_middleware_chain_async(self, settings, caplog: pytest.LogCaptureFixture, tmp_path):
+        # The handler logs every middleware it adapts to the other mode in debug mode.
+        settings.DEBUG = True
+        settings.TRACE_RECORD_FILE = str(tmp_path / "traces.jsonl")
+
+        with caplog.at_level(logging.DEBUG, logger="django.request"):
+            ASGIHandler()
+
+        adapted = {
+            record.args[0].removeprefix("middleware ") for record in caplog.records
+            if record.msg.endswith("handler adapted for %s.")
+        }
+        not_used = {record.args[0] for record in caplog.records if record.msg.startswith("MiddlewareNotUsed")}
+        assert adapted <= not_used
+
+    @pytest.mark.django_db
+    def test_log(self, api_client: APIClient, caplog: pytest.LogCaptureFixture):
+        create_catalog(3)
+
+        with caplog.at_level(logging.INFO, logger="products.timing"):
+            api_client.get(f"{BASE_URL}products/")
+
+        record, = caplog.records
+        assert record.getMessage().startswith("GET /api/v1/products/ 200 view=products:product-list-create queries=")
+        assert record.request_metrics["view"] == "products:product-list-create"
+        assert record.request_metrics["queries"] > 0
+
+    @pytest.mark.django_db
+    def test_query_budget_logged(self, api_client: APIClient, settings, caplog: pytest.LogCaptureFixture):
+        settings.QUERY_BUDGETS = {"products:view-cart-view": 0}
+        settings.QUERY_BUDGET_ACTION = LOG
+
+        response = api_client.get(f"{BASE_URL}view_cart/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "the budget of products:view-cart-view is 0" in caplog.text
+
+    @pytest.mark.django_db
+    def test_query_budget_raised(self, api_client: APIClient, settings):
+        settings.QUERY_BUDGETS = {"products:view-cart-view": 0}
+        settings.QUERY_BUDGET_ACTION = RAISE
+
+        with pytest.raises(QueryBudgetExceeded):
+            api_client.get(f"{BASE_URL}view_cart/")
+
+
+class TestTimed:
+    def test_timed_outside_request(self):
+        with timed("serialize"):
+            pass
+
+    def test_timed_nested(self):
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        try:
+            with timed("serialize"):
+                with timed("serialize"):
+                    metrics.db = 1000
+        finally:
+            _request_metrics.reset(token)
+
+        # Measured once and without the time spent in the database.
+        assert metrics.serialize < 0
+        assert metrics.measuring == set()
@@ -0,0 +1,148 @@
+import json
+import time
+from pathlib import Path
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.models import Cap, CartItem
+from products.traces import InProcessSender, percentile, read_postman_collection, read_traces, replay
+
+from tests import cap_product, api_client
+
+POSTMAN_COLLECTION = Path(__file__).parent.parent / "postman_collection.json"
+
+
+def test_percentile():
+    values = [float(value) for value in range(100, 0, -1)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 99) == 3
+
+
+def test_read_postman_collection():
+    with POSTMAN_COLLECTION.open() as file:
+        traces = read_postman_collection(json.load(file), {"pk": "3"})
+
+    assert [(trace["method"], trace["path"]) for trace in traces] == [
+        ("GET", "/api/v1/products/"),
+        ("POST", "/api/v1/products/"),
+        ("GET", "/api/v1/products/3/"),
+        ("PUT", "/api/v1/products/3/"),
+        ("PATCH", "/api/v1/products/3/"),
+        ("DELETE", "/api/v1/products/3/"),
+        ("POST", "/api/v1/add_product/"),
+        ("GET", "/api/v1/view_cart/"),
+        ("POST", "/api/v1/order/"),
+    ]
+    assert traces[6]["content_type"] == "application/x-www-form-urlencoded"
+    assert traces[6]["body"] == "product_id=8&quantity=15"
+    assert traces[0]["body"] is None
+
+
+def test_replay():
+    traces = [
+        {"method": "GET", "path": "/api/v1/view_cart/"},
+        {"method": "POST", "path": "/api/v1/add_product/"},
+        {"method": "GET", "path": "/api/v1/view_cart/?page=2"},
+        {"method": "GET", "path": "/unknown/"},
+    ]
+    statuses = {"/api/v1/add_product/": 500, "/unknown/": 404}
+
+    start = time.perf_counter()
+    reports, elapsed = replay(traces, lambda trace: statuses.get(trace["path"], 200), concurrency=2, rate=100)
+
+    # The last request is sent 3 / rate seconds after the start.
+    assert time.perf_counter() - start >= 0.03
+    assert {route: len(report.latencies) for route, report in reports.items()} == {
+        "products:view-cart-view": 2, "products:add-product-view": 1, "/unknown/": 1
+    }
+    assert reports["products:add-product-view"].errors == 1
+    assert reports["/unknown/"].errors == 0
+    assert reports["/unknown/"].summary(elapsed)["statuses"] == {404: 1}
+
+
+@pytest.mark.django_db
+def test_in_process_sender(cap_product: Cap):
+    send = InProcessSender()
+
+    status_code = send({
+        "method": "POST",
+        "path": "/api/v1/add_product/",
+        "content_type": "application/json",
+        "body": json.dumps({"product_id": cap_product.id, "quantity": 2}),
+    })
+
+    assert status_code == status.HTTP_201_CREATED
+    assert CartItem.objects.get(product=cap_product).quantity == 2
+
+
+@pytest.mark.django_db
+def test_trace_recorder(api_client: APIClient, cap_product: Cap, settings, tmp_path: Path):
+    settings.TRACE_RECORD_FILE = str(tmp_path / "traces.jsonl")
+
+    api_client.post("/api/v1/add_product/?source=test", {"product_id": cap_product.id, "quantity": 1}, format="json")
+    api_client.get("/api/v1/view_cart/")
+
+    with open(settings.TRACE_RECORD_FILE) as file:
+        traces = list(read_traces(file))
+    assert traces == [
+        {
+            "method": "POST",
+            "path": "/api/v1/add_product/?source=test",
+            "content_type": "application/json",
+            "body": json.dumps({"product_id": cap_product.id, "quantity": 1}, separators=(",", ":")),
+            "status": 201,
+        },
+        {"method": "GET", "path": "/api/v1/view_cart/", "content_type": None, "body": None, "status": 200},
+    ]
+
+    # The recorded traces replay the same requests.
+    send = InProcessSender()
+    assert [send(trace) for trace in traces] == [201, 200]
+    assert CartItem.objects.get(product=cap_product).quantity == 2
+
+
+@pytest.mark.django_db
+def test_trace_recorder_without_body(api_client: APIClient, cap_product: Cap, settings, tmp_path: Path):
+    settings.TRACE_RECORD_FILE = str(tmp_path / "traces.jsonl")
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 100
+
+    api_client.post("/api/v1/add_product/", {"product_id": cap_product.id, "quantity": 1}, format="multipart")
+    api_client.post(
+        "/api/v1/add_product/", {"product_id": cap_product.id, "quantity": 1, "padding": "x" * 100}, format="json"
+    )
+    api_client.post("/api/v1/order/", {
+        "name": "Jane", "last_name": "Doe", "address": "Barcelona, CP 08001", "email": "jane.doe@gmail.com",
+        "mobile_number": "+34123456789"
+    }, format="json")
+
+    with open(settings.TRACE_RECORD_FILE) as file:
+        traces = list(read_traces(file))
+    assert [trace["path"] for trace in traces] == ["/api/v1/add_product/", "/api/v1/add_product/", "/api/v1/order/"]
+    assert all(trace["content_type"] is None and trace["body"] is None for trace in traces)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replay_traces_command(cap_product: Cap, tmp_path: Path):
+    path = tmp_path / "traces.jsonl"
+    path.write_text("\n".join(json.dumps(trace) for trace in [
+        {"method": "POST", "path": "/api/v1/add_product/", "content_type": "application/x-www-form-urlencoded",
+         "body": f"product_id={cap_product.id}&quantity=1"},
+        {"method": "GET", "path": "/api/v1/view_cart/"},
+    ]))
+    out = StringIO()
+
+    call_command("replay_traces", str(path), "--repeat", "3", "--json", stdout=out)
+
+    report = json.loads(out.getvalue())
+    assert report["routes"]["products:add-product-view"]["requests"] == 3
+    assert report["routes"]["products:view-cart-view"]["requests"] == 3
+    assert all(route["errors"] == 0 for route in report["routes"].values())
+    assert CartItem.objects.get(product=cap_product).quantity == 3
@@ -0,0 +1,52 @@
+import pytest
+
+from django.db import connection, connections
+
+from iati_shopping_cart.db_backends.sqlite3.base import DatabaseWrapper
+from products.transactions import write_atomic
+
+
+@pytest.fixture
+def performance_connection(tmp_path, django_db_blocker) -> DatabaseWrapper:
+    settings_dict = connections.settings["default"] | {
+        "NAME": str(tmp_path / "db.sqlite3"),
+        "OPTIONS": {"pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 1234}},
+    }
+    performance_connection = DatabaseWrapper(settings_dict, alias="performance")
+
+    # It's a database of its own, not the test database.
+    with django_db_blocker.unblock():
+        yield performance_connection
+        performance_connection.close()
+
+
+class TestPerformanceDatabaseWrapper:
+    def test_pragmas_applied_on_new_connection(self, performance_connection: DatabaseWrapper):
+        with performance_connection.cursor() as cursor:
+            assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert cursor.execute("PRAGMA synchronous").fetchone()[0] == 1
+            assert cursor.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+
+    def test_transaction_mode(self, performance_connection: DatabaseWrapper):
+        performance_connection.force_debug_cursor = True
+        performance_connection.transaction_mode = "IMMEDIATE"
+
+        performance_connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        performance_connection.rollback()
+        performance_connection.set_autocommit(True)
+
+        assert performance_connection.queries[-1]["sql"] == "BEGIN IMMEDIATE"
+
+
+class TestWriteAtomic:
+    @pytest.mark.django_db(transaction=True)
+    def test_write_atomic(self):
+        with write_atomic():
+            assert connection.in_atomic_block
+            # Only the transaction that is being started is immediate.
+            assert connection.transaction_mode is None
+
+            with write_atomic():
+                assert connection.transaction_mode is None
+
+        assert not connection.in_atomic_block
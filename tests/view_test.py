@@ -1,17 +1,26 @@
+import gzip
 import json
 import random
 from datetime import datetime, timedelta
 
 import pytest
-from pytest_mock import MockerFixture
 
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
-from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem
+from products.models import Product, Cap, Tshirt, ShoppingCart, CartItem, OutboxEmail
+from products.pagination import ProductCursorPagination
 
-from tests import product, cap_product, tshirt_product, shopping_cart, cart_item, api_client
+from utils import get_order_email
+
+from tests import create_catalog, product, cap_product, tshirt_product, shopping_cart, cart_item, api_client
+from tests.importer_test import CAP_ROW, TSHIRT_ROW
 
 
 class TestProductListCreate:
@@ -78,16 +87,194 @@ class TestProductListCreate:
 
         assert response.status_code == status.HTTP_200_OK
 
+        results = response.data["results"]
+
         # Get the 3 products
-        assert len(response.data) == 3
+        assert len(results) == 3
 
         # Ordered by caps first and tshirts second.
-        assert response.data[0]["product_type"] == Product.CAP
-        assert response.data[1]["product_type"] == Product.CAP
-        assert response.data[2]["product_type"] == Product.TSHIRT
+        assert results[0]["product_type"] == Product.CAP
+        assert results[1]["product_type"] == Product.CAP
+        assert results[2]["product_type"] == Product.TSHIRT
 
         # Ordered by inclusion date.
-        assert response.data[0]["inclusion_date"] >= response.data[1]["inclusion_date"]
+        assert results[0]["inclusion_date"] >= results[1]["inclusion_date"]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("catalog_size", [10, 10_000])
+    def test_list_products_query_count(self, api_client: APIClient, django_assert_num_queries, catalog_size: int):
+        create_catalog(catalog_size)
+        # Caps are listed first, fewer caps than a page are left so the first page ends with t-shirts.
+        cap_ids = Product.objects.filter(product_type=Product.CAP).order_by("id").values_list("id", flat=True)
+        Product.objects.filter(id__in=list(cap_ids[ProductCursorPagination.page_size // 2:])).update(is_deleted=True)
+
+        # The conditional GET validators and the products.
+        with django_assert_num_queries(2):
+            response = api_client.get(self.URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == min(catalog_size, ProductCursorPagination.page_size)
+        assert "logo_color" in response.data["results"][0]
+        assert "composition" in response.data["results"][-1]
+
+    @pytest.mark.parametrize("page_size, expected_page_size", [
+        ("10", 10), ("5000", 1000), ("0", 100), ("-1", 100), ("ten", 100)
+    ])
+    def test_list_products_page_size(self, page_size: str, expected_page_size: int):
+        request = Request(APIRequestFactory().get(self.URL, {"page_size": page_size}))
+
+        assert ProductCursorPagination().get_page_size(request) == expected_page_size
+
+    @pytest.mark.django_db
+    def test_list_products_pagination(self, api_client: APIClient):
+        create_catalog(25)
+        # Caps are listed before t-shirts, which matches the alphabetical order of the product types.
+        expected_ids = list(Product.objects.order_by("product_type", "-inclusion_date", "id").values_list(
+            "id", flat=True
+        ))
+
+        ids, url = [], self.URL + "?page_size=10"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [product["id"] for product in response.data["results"]]
+            previous_url, url = response.data["previous"], response.data["next"]
+
+        assert ids == expected_ids
+
+        response = api_client.get(previous_url)
+        assert [product["id"] for product in response.data["results"]] == expected_ids[10:20]
+        response = api_client.get(response.data["previous"])
+        assert [product["id"] for product in response.data["results"]] == expected_ids[:10]
+        assert response.data["previous"] is None
+
+    @pytest.mark.django_db
+    def test_list_products_deep_page_query_count(self, api_client: APIClient, django_assert_num_queries):
+        create_catalog(1_000)
+
+        response = api_client.get(self.URL)
+        for _ in range(5):
+            with django_assert_num_queries(1):
+                response = api_client.get(response.data["next"])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == ProductCursorPagination.page_size
+
+    @pytest.mark.django_db
+    def test_list_products_uses_catalog_index(self, api_client: APIClient):
+        create_catalog(1_000)
+        response = api_client.get(self.URL)
+
+        with CaptureQueriesContext(connection) as context:
+            api_client.get(response.data["next"])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {context.captured_queries[0]['sql']}")
+            query_plan = " ".join(row[-1] for row in cursor.fetchall())
+
+        assert "product_catalog_idx" in query_plan
+        assert "TEMP B-TREE" not in query_plan
+
+    @pytest.mark.django_db
+    def test_list_products_cached(self, api_client: APIClient, django_assert_num_queries, cap_product: Cap):
+        response = api_client.get(self.URL)
+
+        with django_assert_num_queries(0):
+            cached_response = api_client.get(self.URL)
+
+        assert cached_response.status_code == status.HTTP_200_OK
+        assert cached_response.data == response.data
+
+    @pytest.mark.django_db
+    def test_list_products_cached_per_host(self, api_client: APIClient, settings):
+        settings.ALLOWED_HOSTS = ["internal", "api.example.com"]
+        create_catalog(25)
+
+        api_client.get("/api/v1/products/?page_size=10", HTTP_HOST="internal")
+        response = api_client.get("/api/v1/products/?page_size=10", HTTP_HOST="api.example.com", secure=True)
+
+        assert response.data["next"].startswith("https://api.example.com/")
+
+    @pytest.mark.django_db
+    def test_list_products_cache_invalidated_on_create(
+        self, api_client: APIClient, django_capture_on_commit_callbacks, cap_product: Cap
+    ):
+        api_client.get(self.URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(self.URL, data=self.TSHIRT_PRODUCT_DATA)
+
+        response = api_client.get(self.URL)
+
+        assert len(response.data["results"]) == 2
+
+    @pytest.mark.django_db
+    def test_list_products_not_modified(
+        self, api_client: APIClient, django_assert_num_queries, django_capture_on_commit_callbacks, cap_product: Cap
+    ):
+        response = api_client.get(self.URL)
+        etag = response["ETag"]
+
+        with django_assert_num_queries(0):
+            not_modified_response = api_client.get(self.URL + "?page_size=5", HTTP_IF_NONE_MATCH=etag)
+
+        assert not_modified_response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified_response["ETag"] == etag
+        assert not not_modified_response.content
+
+        response = api_client.get(self.URL, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.delete(TestProductRetrieveUpdateDestroy.URL % cap_product.id)
+
+        response = api_client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response.data["results"] == []
+
+    @pytest.mark.django_db
+    def test_list_products_invalid_cursor(self, api_client: APIClient):
+        response = api_client.get(self.URL + "?cursor=dummy")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.django_db
+    def test_list_products_sparse_fields(self, api_client: APIClient):
+        create_catalog(10)
+        fields = {"id", "unit_price", "photo_url", "current_stock"}
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(self.URL, data={"fields": ",".join(fields)})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert all(set(result) == fields for result in response.data["results"])
+        assert len(context.captured_queries) == 2
+        sql = context.captured_queries[1]["sql"]
+        assert "JOIN" not in sql
+        assert '"description"' not in sql
+
+    @pytest.mark.django_db
+    def test_list_products_sparse_subclass_fields(
+        self, api_client: APIClient, django_assert_num_queries, cap_product: Cap, tshirt_product: Tshirt
+    ):
+        with django_assert_num_queries(2):
+            response = api_client.get(self.URL, data={"fields": "id,logo_color"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {result["id"]: result for result in response.data["results"]} == {
+            cap_product.id: {"id": cap_product.id, "logo_color": cap_product.logo_color},
+            tshirt_product.id: {"id": tshirt_product.id},
+        }
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("fields", ["id,dummy", ","])
+    def test_list_products_invalid_fields(self, api_client: APIClient, fields: str):
+        response = api_client.get(self.URL, data={"fields": fields})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "fields" in response.data
 
 
 class TestProductRetrieveUpdateDestroy:
@@ -104,6 +291,93 @@ class TestProductRetrieveUpdateDestroy:
         assert response.data["id"] == product.id
         assert response.data["main_color"] == product.main_color
 
+    @pytest.mark.django_db
+    def test_product_retrieve_sparse_fields(
+        self, api_client: APIClient, django_assert_num_queries, tshirt_product: Tshirt
+    ):
+        with django_assert_num_queries(2):
+            response = api_client.get(self.URL % tshirt_product.id, data={"fields": "unit_price,size"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {"unit_price", "size"}
+        assert response.data["size"] == tshirt_product.size
+
+    @pytest.mark.django_db
+    def test_product_retrieve_query_count(
+        self, api_client: APIClient, django_assert_num_queries, cap_product: Cap, tshirt_product: Tshirt
+    ):
+        for subclass_product in (cap_product, tshirt_product):
+            # The conditional GET validators and the product.
+            with django_assert_num_queries(2):
+                response = api_client.get(self.URL % subclass_product.id)
+
+            assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_product_retrieve_cache_invalidated_on_update(
+        self, api_client: APIClient, django_assert_num_queries, django_capture_on_commit_callbacks, cap_product: Cap
+    ):
+        url = self.URL % cap_product.id
+        api_client.get(url)
+
+        with django_assert_num_queries(0):
+            api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(url, {"main_color": "blue"}, format="json")
+
+        response = api_client.get(url)
+
+        assert response.data["main_color"] == "blue"
+
+    @pytest.mark.django_db
+    def test_product_retrieve_cache_invalidated_on_add_to_cart(
+        self, api_client: APIClient, django_capture_on_commit_callbacks, cap_product: Cap
+    ):
+        url = self.URL % cap_product.id
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(TestCartItemCreate.URL, data={"product_id": cap_product.id, "quantity": 1})
+
+        response = api_client.get(url)
+
+        assert response.data["current_stock"] == cap_product.current_stock - 1
+
+    @pytest.mark.django_db
+    def test_product_retrieve_not_modified(
+        self, api_client: APIClient, django_capture_on_commit_callbacks, cap_product: Cap, tshirt_product: Tshirt
+    ):
+        url = self.URL % cap_product.id
+        response = api_client.get(url)
+        etag = response["ETag"]
+
+        assert response["Last-Modified"]
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        # Changes to other products don't change its validators.
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(TestCartItemCreate.URL, data={"product_id": tshirt_product.id, "quantity": 1})
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(url, {"logo_color": "yellow"}, format="json")
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["logo_color"] == "yellow"
+
+    @pytest.mark.django_db
+    def test_product_retrieve_not_found_without_validators(self, api_client: APIClient, product: Product):
+        Product.objects.filter(id=product.id).update(is_deleted=True)
+
+        response = api_client.get(self.URL % product.id, HTTP_IF_NONE_MATCH="*")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "ETag" not in response
+
     @pytest.mark.django_db
     def test_product_update_cap(self, api_client: APIClient, cap_product: Cap):
         url = self.URL % cap_product.id
@@ -155,6 +429,20 @@ class TestProductRetrieveUpdateDestroy:
         assert product.is_deleted is True
         assert product.deleted_at >= utc_now_date
 
+    @pytest.mark.django_db
+    def test_product_delete_cache_invalidated(
+        self, api_client: APIClient, django_capture_on_commit_callbacks, cap_product: Cap
+    ):
+        url = self.URL % cap_product.id
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.delete(url)
+
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
 
 class TestCartItemCreate:
     URL = "http://127.0.0.1:8000/api/v1/add_product/"
@@ -192,6 +480,164 @@ class TestCartItemCreate:
         assert cart_item.quantity == current_quantity + payload["quantity"]
         assert cart_item.product.current_stock == current_stock - payload["quantity"]
 
+    @pytest.mark.django_db
+    def test_cart_item_update_single_write(self, api_client: APIClient, cart_item: CartItem):
+        payload = {"product_id": cart_item.product.id, "quantity": 1}
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(self.URL, data=payload)
+
+        cart_item_queries = [query["sql"] for query in context.captured_queries if "products_cartitem" in query["sql"]]
+        assert response.status_code == status.HTTP_201_CREATED
+        # The line is inserted or incremented by a single upsert, without reading it first.
+        assert len(cart_item_queries) == 1
+        assert cart_item_queries[0].startswith("INSERT")
+        assert "ON CONFLICT" in cart_item_queries[0]
+        assert CartItem.objects.filter(product=cart_item.product).count() == 1
+
+
+class TestProductExport:
+    URL = "http://127.0.0.1:8000/api/v1/products/export/"
+
+    @pytest.mark.django_db
+    def test_product_export(self, api_client: APIClient, cap_product: Cap, tshirt_product: Tshirt):
+        response = api_client.get(self.URL)
+
+        rows = [json.loads(line) for line in gzip.decompress(b"".join(response.streaming_content)).splitlines()]
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/gzip"
+        assert response["Content-Disposition"] == 'attachment; filename="catalog.ndjson.gz"'
+        assert [row["id"] for row in rows] == [cap_product.id, tshirt_product.id]
+        assert rows[1]["composition"] == tshirt_product.composition
+
+    @pytest.mark.django_db
+    def test_product_export_invalid_format(self, api_client: APIClient):
+        response = api_client.get(self.URL, {"export_format": "xml"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestProductImport:
+    URL = "http://127.0.0.1:8000/api/v1/products/import/"
+
+    @pytest.mark.django_db
+    def test_product_import(self, api_client: APIClient):
+        file = SimpleUploadedFile(
+            "products.ndjson", "\n".join([json.dumps(CAP_ROW), "not json", json.dumps(TSHIRT_ROW)]).encode()
+        )
+
+        response = api_client.post(self.URL, data={"file": file}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["created"] == 2
+        assert [error["row"] for error in response.data["errors"]] == [2]
+        assert Cap.objects.count() == 1
+        assert Tshirt.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_product_import_invalid_format(self, api_client: APIClient):
+        file = SimpleUploadedFile("products.xml", b"<products/>")
+
+        response = api_client.post(self.URL, data={"file": file, "format": "xml"}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "format" in response.data
+
+
+class TestCartItemBatchCreate:
+    URL = "http://127.0.0.1:8000/api/v1/add_products/"
+
+    @pytest.mark.django_db
+    def test_cart_items_batch_create(self, api_client: APIClient, cart_item: CartItem, cap_product: Cap):
+        payload = [
+            {"product_id": cap_product.id, "quantity": 2},
+            {"product_id": cart_item.product.id, "quantity": 3},
+            {"product_id": cap_product.id},
+        ]
+
+        response = api_client.post(self.URL, data=payload, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["total_products"] == cart_item.quantity + 6
+        assert [(product["product_id"], product["quantity"]) for product in response.data["products"]] == [
+            (cart_item.product.id, cart_item.quantity + 3), (cap_product.id, 3)
+        ]
+
+        cap_product.refresh_from_db()
+        assert cap_product.current_stock == 77
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("batch_size", [2, 20])
+    def test_cart_items_batch_create_query_count(
+        self, api_client: APIClient, shopping_cart: ShoppingCart, batch_size: int
+    ):
+        products = create_catalog(batch_size)
+        CartItem.objects.create(shopping_cart=shopping_cart, product=products[0], quantity=1)
+        payload = [{"product_id": product.id, "quantity": 1} for product in products]
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(self.URL, data=payload, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data["products"]) == batch_size
+        # Validation, cart, lines, stock, ledger and response, independent of the number of products.
+        assert len(context.captured_queries) <= 12
+
+    @pytest.mark.django_db
+    def test_cart_items_batch_create_item_errors(self, api_client: APIClient, cap_product: Cap):
+        payload = [
+            {"product_id": cap_product.id, "quantity": 1},
+            {"product_id": cap_product.id, "quantity": cap_product.current_stock + 1},
+            {"product_id": 1000, "quantity": 1},
+            {"product_id": cap_product.id, "quantity": 0},
+        ]
+
+        response = api_client.post(self.URL, data=payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert response.data[1]["quantity"][0] == "Not enough stock available."
+        assert response.data[2]["product_id"][0] == "Product with id 1000 does not exist."
+        assert response.data[3]["quantity"][0] == "You need to add or remove products from your shopping cart, " \
+                                                  "cannot be zero."
+        assert not CartItem.objects.exists()
+
+    @pytest.mark.django_db
+    def test_cart_items_batch_create_not_enough_total_stock(
+        self, api_client: APIClient, cap_product: Cap, tshirt_product: Tshirt
+    ):
+        payload = [
+            {"product_id": tshirt_product.id, "quantity": 1},
+            {"product_id": cap_product.id, "quantity": cap_product.current_stock},
+            {"product_id": cap_product.id, "quantity": 1},
+        ]
+
+        response = api_client.post(self.URL, data=payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert response.data[1]["quantity"][0] == "Not enough stock available."
+        assert response.data[2]["quantity"][0] == "Not enough stock available."
+        assert not CartItem.objects.exists()
+
+        tshirt_product.refresh_from_db()
+        assert tshirt_product.current_stock == 80
+
+    @pytest.mark.django_db
+    def test_cart_items_batch_create_empty(self, api_client: APIClient):
+        response = api_client.post(self.URL, data=[], format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_cart_items_batch_create_too_many_items(self, api_client: APIClient, django_assert_num_queries):
+        data = [{"product_id": product_id, "quantity": 1} for product_id in range(1, 2002)]
+
+        with django_assert_num_queries(0):
+            response = api_client.post(self.URL, data=data, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 class TestShoppingCartView:
     URL = "http://127.0.0.1:8000/api/v1/view_cart/"
@@ -225,12 +671,29 @@ class TestShoppingCartView:
         assert response.data["products"][1]["product_id"] == cap_product.id
         assert response.data["products"][1]["quantity"] == payload["quantity"]
 
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("cart_lines", [1, 500])
+    def test_shopping_cart_retrieve_query_count(
+        self, api_client: APIClient, django_assert_num_queries, shopping_cart: ShoppingCart, cart_lines: int
+    ):
+        products = create_catalog(cart_lines)
+        CartItem.objects.bulk_create([
+            CartItem(shopping_cart=shopping_cart, product=product, quantity=2) for product in products
+        ])
+
+        with django_assert_num_queries(2):
+            response = api_client.get(self.URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["products"]) == cart_lines
+        assert response.data["total_products"] == 2 * cart_lines
+
 
 class TestOrderView:
     URL = "http://127.0.0.1:8000/api/v1/order/"
 
     @pytest.mark.django_db
-    def test_order_view_invalid_form(self, api_client: APIClient, cart_item: CartItem, mocker: MockerFixture):
+    def test_order_view_invalid_form(self, api_client: APIClient, cart_item: CartItem):
         payload = {
             "name": "Jane",
             "last_name": "Doe",
@@ -240,15 +703,13 @@ class TestOrderView:
         }
         payload.pop(random.choice(list(payload.keys())))
 
-        mock_send_order_email = mocker.patch("utils.send_order_email")
-
         response = api_client.post(self.URL, data=payload)
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
-        mock_send_order_email.assert_not_called()
+        assert not OutboxEmail.objects.exists()
 
     @pytest.mark.django_db
-    def test_order_view_without_shopping_cart(self, api_client: APIClient, mocker: MockerFixture):
+    def test_order_view_without_shopping_cart(self, api_client: APIClient):
         payload = {
             "name": "Jane",
             "last_name": "Doe",
@@ -257,17 +718,15 @@ class TestOrderView:
             "mobile_number": "+34123456789"
         }
 
-        mock_send_order_email = mocker.patch("utils.send_order_email")
-
         response = api_client.post(self.URL, data=payload)
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "message" in response.data
         assert response.data["message"] == "There is no current shopping cart."
-        mock_send_order_email.assert_not_called()
+        assert not OutboxEmail.objects.exists()
 
     @pytest.mark.django_db
-    def test_order_view(self, api_client: APIClient, cart_item: CartItem, mocker: MockerFixture):
+    def test_order_view(self, api_client: APIClient, cart_item: CartItem):
         payload = {
             "name": "Jane",
             "last_name": "Doe",
@@ -276,10 +735,11 @@ class TestOrderView:
             "mobile_number": "+34123456789"
         }
 
-        mock_send_order_email = mocker.patch("products.views.send_order_email")
-
         response = api_client.post(self.URL, data=payload)
 
+        # The email is queued, not sent during the request.
+        email = OutboxEmail.objects.get()
         assert response.status_code == status.HTTP_200_OK
-        mock_send_order_email.assert_called_once_with(payload)
+        assert len(mail.outbox) == 0
+        assert (email.subject, email.body, email.from_email, email.recipients) == get_order_email(payload)
         assert ShoppingCart.objects.filter(purchased=False).exists() is False
@@ -1,11 +1,9 @@
 """Module to define all the project utilities.
 """
 
-from django.core.mail import send_mail
 
-
-def send_order_email(order_form: dict) -> None:
-    """Sends an email to the customer.
+def get_order_email(order_form: dict) -> tuple[str, str, str, list[str]]:
+    """Return the subject, message, sender and recipients of the email sent to the customer.
     """
 
     name = order_form["name"]
@@ -19,4 +17,4 @@ def send_order_email(order_form: dict) -> None:
               f"{mobile_number} in case of a delay."
     from_email = "shopping_cart@gmail.com"
 
-    send_mail(subject, message, from_email, [email])
+    return subject, message, from_email, [email]